@@ -4,14 +4,21 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import ValidationError
 from app.config import settings
+from app.core import tracing
+from app.core.principal_cache import principal_cache
 from app.models.user import User
 from app.schemas.token import TokenPayload
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> User:
-    print("TOKEN IN get_current_user:", token)
+    """
+    Resolve the user a bearer token belongs to.
 
+    Users are served from the principal cache when possible. With
+    ``auth_trust_token_claims`` the id and role signed into the token are used
+    directly, so changes apply once the token expires.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -22,13 +29,21 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> Use
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        token_data = TokenPayload(sub=username)
+        token_data = TokenPayload(sub=username, uid=payload.get("uid"), role=payload.get("role"))
     except (JWTError, ValidationError):
         raise credentials_exception
-    
-    user = await User.find_one(User.email == token_data.sub)
+
+    if settings.auth_trust_token_claims and token_data.uid and token_data.role:
+        tracing.bind(user_id=token_data.uid)
+        return User.model_construct(id=token_data.uid, email=token_data.sub, role=token_data.role, is_active=True)
+
+    user = principal_cache.get(token_data.sub)
     if user is None:
-        raise credentials_exception
+        user = await User.find_one(User.email == token_data.sub)
+        if user is None:
+            raise credentials_exception
+        principal_cache.put(token_data.sub, user)
+    tracing.bind(user_id=str(user.id))
     return user
 
 async def get_current_active_user(current_user: Annotated[User, Depends(get_current_user)]) -> User:
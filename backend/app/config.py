@@ -20,6 +20,7 @@ class Settings(BaseSettings):
     # API
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    web_concurrency: int = 1  # server worker processes; set WEB_CONCURRENCY to match uvicorn --workers
 
     # CORS
     cors_origins: str = "http://localhost:3000,http://localhost:3001"
@@ -36,16 +37,107 @@ class Settings(BaseSettings):
     pinecone_api_key: str  # loaded from .env
     pinecone_env: str      # loaded from .env
     pinecone_index_name: str  # loaded from .env
+    vector_backend: str = "pinecone"  # "pinecone" or "local"
+    pinecone_retry_interval: float = 30.0  # seconds between reconnect attempts after a failure
+    vector_dimension: int = 128  # face embedding size
+    local_index_ivf_threshold: int = 20000  # switch local index to IVF search at this size
+    local_index_nprobe: int = 8  # IVF lists scanned per local query
+    local_index_dir: str = ""  # optional directory local index shards are persisted to
+    local_index_persist_delay: float = 5.0  # seconds after a write before a shard is saved; bounds what a crash loses
+    vector_upsert_batch_size: int = 100  # vectors per upsert request
+    vector_upsert_max_bytes: int = 2 * 1000 * 1000  # approximate payload cap per request
+    vector_upsert_concurrency: int = 8  # upsert requests in flight
+    vector_upsert_max_retries: int = 3
+    vector_upsert_backoff: float = 0.5  # seconds, doubled per retry
+    vector_max_workers: int = 8  # threads for blocking vector store calls
+    vector_max_concurrency: int = 16  # vector calls admitted at once (others wait)
+    vector_timeout: float = 10.0  # seconds before an async vector call gives up
 
+    # Search cache
+    # Writes invalidate the cache of the process that made them at once. Other
+    # processes only see them when entries expire, so a search can miss newly
+    # indexed photos for up to the effective TTL: search_cache_ttl with one
+    # process, at most search_cache_shared_ttl with several workers or the
+    # mongo ingest queue.
+    search_cache_enabled: bool = True
+    search_cache_max_entries: int = 10000
+    search_cache_max_bytes: int = 64 * 1024 * 1024
+    search_cache_ttl: float = 300.0  # seconds
+    search_cache_shared_ttl: float = 5.0  # TTL cap when other processes write vectors
+    search_cache_quantization: float = 0.01  # embedding step treated as identical
+
+    # Search
+    embedding_model: str = "reference"  # "reference" or "package.module:EmbedderClass"
+    search_max_results: int = 500  # face matches fetched per query before paging
+    search_page_size: int = 50
+    search_max_faces: int = 8  # faces per query (group selfies)
+    search_max_distance: float = 0.36  # squared euclidean cutoff for matches (0.6 same-person distance); 0 disables
+    max_selfie_size: int = 10 * 1024 * 1024
+    selfie_embedding_workers: int = 1  # processes embedding selfies at query time
+    selfie_batch_size: int = 32  # selfies embedded per worker call
+    selfie_batch_wait: float = 0.005  # seconds to coalesce concurrent selfies
+
+    # Startup
+    startup_timeout: float = 20.0  # seconds to wait for optional services before booting degraded
+
+    # Metrics
+    metrics_dir: str = ""  # shared directory for per-worker snapshots; empty serves this process only
+    metrics_flush_interval: float = 5.0  # seconds between snapshot writes
+    metrics_stale_after: float = 60.0  # drop snapshots of workers that stopped writing for this long
+
+    # Tracing and profiling
+    trace_slow_request: float = 1.0  # requests slower than this log their stage timings at INFO
+    profile_dir: str = "profiles"  # where on-demand CPU profiles are written
+    profile_max_requests: int = 1000  # most requests one profiling session may cover
 
     # Security
     jwt_secret_key: str 
     jwt_algorithm: str 
     access_token_expire_minutes: int = 30
+    auth_cache_max_entries: int = 10000  # users kept in the principal cache
+    auth_cache_ttl: float = 60.0  # seconds a cached user is trusted
+    auth_trust_token_claims: bool = False  # build the user from signed token claims, skipping the DB
+    password_schemes: str = "sha256_crypt"  # passlib schemes; the first hashes, the rest are rehashed on login
+    password_hash_rounds: int = 0  # rounds for the hashing scheme; 0 keeps passlib's default
+    password_hash_workers: int = 2  # processes hashing passwords
+    password_hash_max_pending: int = 32  # hashes queued or running before new ones get 429
 
     # Uploads
     upload_dir: str = "media"
-    max_upload_size: int = 100 * 1024 * 1024  # 100MB default
+    max_upload_size: int = 100 * 1024 * 1024  # 100MB default, per request
+    max_file_size: int = 50 * 1024 * 1024  # per image, including images inside ZIPs
+    upload_chunk_size: int = 1024 * 1024  # bytes read per streaming write
+    io_max_workers: int = 8  # threads for blocking file I/O
+    zip_extract_concurrency: int = 8  # ZIP members decompressed in parallel
+    metadata_batch_size: int = 500  # ImageMetadata docs per insert_many
+    metadata_flush_interval: float = 1.0  # seconds before a partial batch is flushed
+    resumable_max_size: int = 20 * 1024 * 1024 * 1024  # largest file accepted by resumable uploads
+    resumable_max_chunk_size: int = 64 * 1024 * 1024  # largest single PUT
+    resumable_write_lease: float = 120.0  # seconds a chunk writer holds a session without making progress
+    resumable_session_ttl: float = 24 * 3600  # seconds an upload may sit idle before its session expires and its data is deleted
+
+    # Thumbnails
+    thumbnail_size: int = 320  # longest side of gallery grid thumbnails
+    preview_size: int = 1280  # longest side of previews
+    thumbnail_format: str = "WEBP"  # "WEBP" or "JPEG"
+    thumbnail_quality: int = 80
+    thumbnail_workers: int = 2  # processes rendering thumbnails
+    download_max_images: int = 1000  # photos per ZIP download
+    media_cache_max_age: int = 365 * 24 * 3600  # seconds clients may cache content-addressed files
+    media_derived_max_age: int = 24 * 3600  # seconds clients may reuse a thumbnail or preview before revalidating
+
+    # Ingestion
+    ingest_queue_backend: str = "memory"  # "memory" or "mongo"
+    ingest_upload_workers: int = 2  # upload jobs run concurrently per process
+    ingest_processing_workers: int = 32  # images processed concurrently per process (feeds embedding batches)
+    ingest_poll_interval: float = 1.0  # seconds between polls of the mongo queue
+    media_orphan_grace: float = 3600.0  # seconds an unreferenced blob is kept before the sweeper deletes it
+    media_sweep_interval: float = 3600.0  # seconds between orphan sweeps
+    ingest_stale_after: float = 900.0  # seconds before a PROCESSING image or silent RUNNING job counts as abandoned
+    embedding_workers: int = 2  # processes running face detection/embedding
+    embedding_batch_size: int = 16  # images embedded per worker call
+    embedding_batch_wait: float = 0.05  # seconds to wait for a batch to fill
+    embedding_max_side: int = 2048  # images are decoded at most this large for face detection
 
 
 # Global settings instance
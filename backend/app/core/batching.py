@@ -0,0 +1,121 @@
+"""Coalesce concurrent requests into batches for batch-efficient workers."""
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Generic, List, Optional, Tuple, TypeVar, Union
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Handlers return one result per item; an exception fails only its own item
+BatchHandler = Callable[[List[T]], Awaitable[List[Union[R, BaseException]]]]
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collects items submitted by concurrent callers and runs them in batches.
+
+    A batch is dispatched once it holds ``max_size`` items or ``max_wait``
+    seconds after its first item arrived, whichever comes first. Up to
+    ``concurrency`` batches run at once; while all are busy, the next batch
+    keeps filling. The background task starts on the first ``submit``.
+    """
+
+    def __init__(self, handler: BatchHandler, max_size: int, max_wait: float, concurrency: int = 1, name: str = "batcher"):
+        self.handler = handler
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.concurrency = concurrency
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self._pending: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._running: set = set()
+
+    @property
+    def pending(self) -> int:
+        """Items waiting for a batch."""
+        return self._pending.qsize() if self._pending else 0
+
+    @property
+    def in_flight(self) -> int:
+        """Batches currently being handled."""
+        return len(self._running)
+
+    async def submit(self, item: T) -> R:
+        """Queue an item and wait for its result."""
+        if self._loop_task is None or self._loop_task.done():
+            self._pending = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            # A fresh context keeps the first caller's request ids and trace
+            # out of the long-lived collector and the batches it starts
+            self._loop_task = asyncio.create_task(self._collect(), name=self.name, context=contextvars.Context())
+        future = asyncio.get_running_loop().create_future()
+        self._pending.put_nowait((item, future))
+        return await future
+
+    async def stop(self) -> None:
+        """Cancel the collector and running batches; waiting callers are cancelled."""
+        tasks = [task for task in [self._loop_task, *self._running] if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._pending is not None:
+            while not self._pending.empty():
+                _, future = self._pending.get_nowait()
+                future.cancel()
+        self._loop_task = None
+        self._running.clear()
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Hold a slot before collecting so a batch keeps filling while workers are busy
+            await self._slots.acquire()
+            batch: List[Tuple[T, asyncio.Future]] = []
+            try:
+                batch.append(await self._pending.get())
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._pending.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except BaseException:
+                self._slots.release()
+                for _, future in batch:
+                    future.cancel()
+                raise
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"{self.name}: batch of {len(batch)} failed: {e}")
+            results = [e] * len(batch)
+        finally:
+            self._slots.release()
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
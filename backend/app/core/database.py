@@ -1,31 +1,58 @@
+import threading
+import time
+from typing import Any
 from beanie import init_beanie
 from motor.motor_asyncio import AsyncIOMotorClient
-try:
-    from pinecone import Pinecone, ServerlessSpec
-except ImportError:
-    Pinecone = None
-    ServerlessSpec = None
-    print("Warning: pinecone-client not installed or failed to import")
+from pymongo import monitoring
 from app.config import settings
 from app.models.user import User
 from app.models.photo import Photo
 from app.models.event import Event
 from app.models.image import ImageMetadata
+from app.models.job import IngestJob
+from app.models.upload_session import UploadSession
+from app.core.executors import run_io
 from app.core.logging import get_logger
+from app.core import tracing
+from app.core.metrics import registry
 
 logger = get_logger(__name__)
 
 class Database:
     client: AsyncIOMotorClient = None
-    pinecone: Pinecone = None
+    pinecone: Any = None
     pinecone_index = None
 
 db = Database()
 
+MONGO_COMMAND_SECONDS = registry.histogram("mongo_command_duration_seconds", "MongoDB command latency", ["command"])
+MONGO_COMMAND_FAILURES = registry.counter("mongo_command_failures_total", "Failed MongoDB commands", ["command"])
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records the latency of every MongoDB command the driver runs."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+        # Motor runs commands with the caller's context, so this lands in the request's trace
+        tracing.record("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+        tracing.record("mongo", event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.inc(command=event.command_name)
+
+
+_pinecone_lock = threading.Lock()
+_pinecone_failed_at = None  # monotonic time of the last failed connect
+
 async def init_mongo():
     """Initialize MongoDB connection and Beanie models."""
     try:
-        db.client = AsyncIOMotorClient(settings.mongodb_url)
+        db.client = AsyncIOMotorClient(settings.mongodb_url, event_listeners=[CommandMetrics()])
         # Verify connection
         await db.client.admin.command('ping')
         db.database = db.client.get_default_database()
@@ -40,6 +67,8 @@ async def init_mongo():
                 Photo,
                 Event,
                 ImageMetadata,
+                IngestJob,
+                UploadSession,
             ]
         )
     except Exception as e:
@@ -47,8 +76,28 @@ async def init_mongo():
         raise e
 
 def init_pinecone():
-    """Initialize Pinecone client and index."""
-    if Pinecone is None:
+    """
+    Initialize Pinecone client and index.
+
+    Blocking (network calls); run on the I/O executor. Safe to call more than
+    once: later calls return as soon as the index is connected, and after a
+    failure reconnects are attempted at most every pinecone_retry_interval
+    seconds. The client library is imported here so deployments on the local
+    backend never load it.
+    """
+    global _pinecone_failed_at
+    with _pinecone_lock:
+        if db.pinecone_index is not None:
+            return
+        if _pinecone_failed_at is not None and time.monotonic() - _pinecone_failed_at < settings.pinecone_retry_interval:
+            return
+        _connect_pinecone()
+        _pinecone_failed_at = None if db.pinecone_index is not None else time.monotonic()
+
+def _connect_pinecone():
+    try:
+        from pinecone import Pinecone, ServerlessSpec
+    except ImportError:
         logger.warning("Pinecone module not found. Vector search disabled.")
         return
 
@@ -66,7 +115,7 @@ def init_pinecone():
             logger.info(f"Creating Pinecone index: {settings.pinecone_index_name}")
             db.pinecone.create_index(
                 name=settings.pinecone_index_name,
-                dimension=128,  # Face recognition embedding dimension (e.g., for dlib/face_recognition)
+                dimension=settings.vector_dimension,  # Face recognition embedding dimension (e.g., for dlib/face_recognition)
                 metric="euclidean",
                 spec=ServerlessSpec(
                     cloud="aws",
@@ -83,6 +132,7 @@ def init_pinecone():
         # or raise if it's critical. For now, we log error.
 
 async def init_db():
-    """Initialize all database connections."""
+    """Initialize all database connections. See app.core.startup for app startup."""
     await init_mongo()
-    init_pinecone()
+    if settings.vector_backend.lower() == "pinecone":
+        await run_io(init_pinecone)
@@ -0,0 +1,141 @@
+"""Shared executors for blocking work that must stay off the event loop."""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_vector_executor: Optional[ThreadPoolExecutor] = None
+_embedding_executor: Optional[ProcessPoolExecutor] = None
+_selfie_executor: Optional[ProcessPoolExecutor] = None
+_media_executor: Optional[ProcessPoolExecutor] = None
+_password_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """
+    Get the bounded thread pool used for blocking file I/O.
+
+    Returns:
+        Lazily created executor sized by ``settings.io_max_workers``
+    """
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(
+            max_workers=settings.io_max_workers,
+            thread_name_prefix="media-io",
+        )
+    return _io_executor
+
+
+def get_vector_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool reserved for blocking vector store calls.
+
+    Kept separate from the I/O pool so slow vector queries cannot starve uploads.
+
+    Returns:
+        Lazily created executor sized by ``settings.vector_max_workers``
+    """
+    global _vector_executor
+    if _vector_executor is None:
+        _vector_executor = ThreadPoolExecutor(
+            max_workers=settings.vector_max_workers,
+            thread_name_prefix="vector-store",
+        )
+    return _vector_executor
+
+
+def _embedding_pool(workers: int) -> ProcessPoolExecutor:
+    from app.services.embedding import init_worker
+
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(settings.embedding_model,),
+    )
+
+
+def get_embedding_executor() -> ProcessPoolExecutor:
+    """
+    Get the process pool that runs face detection and embedding for ingest.
+
+    Model inference is CPU bound and holds the GIL, so it runs in separate
+    processes; each worker loads the model once on start.
+
+    Returns:
+        Lazily created executor sized by ``settings.embedding_workers``
+    """
+    global _embedding_executor
+    if _embedding_executor is None:
+        _embedding_executor = _embedding_pool(settings.embedding_workers)
+    return _embedding_executor
+
+
+def get_selfie_executor() -> ProcessPoolExecutor:
+    """
+    Get the process pool that embeds selfies at query time.
+
+    Separate from the ingest pool so a large upload cannot delay searches.
+
+    Returns:
+        Lazily created executor sized by ``settings.selfie_embedding_workers``
+    """
+    global _selfie_executor
+    if _selfie_executor is None:
+        _selfie_executor = _embedding_pool(settings.selfie_embedding_workers)
+    return _selfie_executor
+
+
+def get_media_executor() -> ProcessPoolExecutor:
+    """
+    Get the process pool for CPU-bound image work such as thumbnails.
+
+    Returns:
+        Lazily created executor sized by ``settings.thumbnail_workers``
+    """
+    global _media_executor
+    if _media_executor is None:
+        _media_executor = ProcessPoolExecutor(max_workers=settings.thumbnail_workers)
+    return _media_executor
+
+
+def get_password_executor() -> ProcessPoolExecutor:
+    """
+    Get the process pool for password hashing.
+
+    Hashes cost hundreds of milliseconds of CPU each, so they run outside
+    the server process where they cannot hold up the event loop.
+
+    Returns:
+        Lazily created executor sized by ``settings.password_hash_workers``
+    """
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+    return _password_executor
+
+
+async def run_io(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking I/O callable on the shared I/O executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown_executors() -> None:
+    """Shut down any executors that were created."""
+    global _io_executor, _vector_executor, _embedding_executor, _selfie_executor, _media_executor, _password_executor
+    executors = (_io_executor, _vector_executor, _embedding_executor, _selfie_executor, _media_executor, _password_executor)
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    _io_executor = None
+    _vector_executor = None
+    _embedding_executor = None
+    _selfie_executor = None
+    _media_executor = None
+    _password_executor = None
@@ -0,0 +1,31 @@
+"""Content sniffing for uploaded files."""
+from typing import Dict, Tuple
+
+# Leading bytes of each accepted file type
+SIGNATURES: Dict[str, Tuple[bytes, ...]] = {
+    ".jpg": (b"\xff\xd8\xff",),
+    ".jpeg": (b"\xff\xd8\xff",),
+    ".png": (b"\x89PNG\r\n\x1a\n",),
+    ".zip": (b"PK\x03\x04", b"PK\x05\x06"),
+}
+
+# Bytes needed to recognise any signature
+SNIFF_SIZE = max(len(signature) for signatures in SIGNATURES.values() for signature in signatures)
+
+
+class InvalidUpload(ValueError):
+    """A file that is too large or whose content does not match its extension."""
+
+
+def matches_extension(ext: str, head: bytes) -> bool:
+    """Check the first bytes of a file against the signature for its extension."""
+    return any(head.startswith(signature) for signature in SIGNATURES.get(ext, ()))
+
+
+def check_head(ext: str, head: bytes) -> None:
+    """
+    Raises:
+        InvalidUpload: if ``head`` does not start like a ``ext`` file
+    """
+    if not matches_extension(ext, head):
+        raise InvalidUpload("Content does not match type")
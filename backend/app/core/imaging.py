@@ -0,0 +1,113 @@
+"""Reduced-resolution image decoding and downscaled renditions."""
+import io
+import os
+import uuid
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple, Union
+
+from PIL import ExifTags, Image, ImageOps
+
+# A stored file path, encoded bytes or an open binary stream
+ImageSource = Union[str, bytes, BinaryIO]
+
+# EXIF orientations that rotate the image by 90 degrees, swapping width and height
+_SWAPPED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+class LoadedImage(NamedTuple):
+    image: Image.Image
+    scale: float  # original pixels per loaded pixel
+    original_size: Tuple[int, int]  # as displayed, after EXIF orientation
+
+
+def _open(source: ImageSource) -> Image.Image:
+    return Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _displayed_size(image: Image.Image) -> Tuple[int, int]:
+    width, height = image.size
+    if image.getexif().get(ExifTags.Base.Orientation) in _SWAPPED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def image_size(source: ImageSource) -> Tuple[int, int]:
+    """
+    Read an image's displayed (width, height) from its header without
+    decoding pixels, honouring the EXIF orientation.
+    """
+    with _open(source) as image:
+        return _displayed_size(image)
+
+
+def load_image(source: ImageSource, max_side: Optional[int] = None, mode: str = "RGB") -> LoadedImage:
+    """
+    Decode an image at no more resolution than the caller needs.
+
+    JPEGs are decoded with DCT scaling (``Image.draft``) at the smallest of
+    1/1, 1/2, 1/4 or 1/8 that still covers ``max_side``, which skips most of
+    the decode work for large camera files; the remainder is downscaled with
+    a reducing resize. Other formats are decoded in full, then downscaled.
+    The EXIF orientation is applied, so portrait camera and phone photos
+    come out upright.
+
+    Args:
+        source: Image path, bytes or stream
+        max_side: Longest side of the returned image; None keeps full size
+        mode: Pillow mode to convert to
+
+    Returns:
+        The loaded image, the factor mapping its coordinates back to the
+        original, and the original size
+    """
+    with _open(source) as image:
+        original_size = _displayed_size(image)
+        if max_side and max(original_size) > max_side:
+            ratio = max_side / max(original_size)
+            target = (max(1, round(image.size[0] * ratio)), max(1, round(image.size[1] * ratio)))
+            image.draft(mode, target)
+            loaded = image.convert(mode) if image.mode != mode else image.copy()
+            ImageOps.exif_transpose(loaded, in_place=True)
+            if max(loaded.size) > max_side:
+                loaded.thumbnail((max_side, max_side), Image.BILINEAR, reducing_gap=2.0)
+        else:
+            loaded = image.convert(mode) if image.mode != mode else image.copy()
+            ImageOps.exif_transpose(loaded, in_place=True)
+    scale = original_size[0] / loaded.size[0] if loaded.size[0] else 1.0
+    return LoadedImage(loaded, scale, original_size)
+
+
+def render_resized(source: ImageSource, outputs: List[Tuple[str, int]], format: str, quality: int) -> List[str]:
+    """
+    Write downscaled copies of an image, decoding it once.
+
+    Outputs that already exist are left alone, so renditions of identical
+    content are shared. Files are written to a temporary name and moved into
+    place, so readers never see a partial file.
+
+    Args:
+        source: Image path, bytes or stream
+        outputs: (path, longest side) per rendition
+        format: Pillow format name, e.g. ``"WEBP"`` or ``"JPEG"``
+        quality: Encoder quality (1-100)
+
+    Returns:
+        Paths of the renditions, in the order given
+    """
+    missing = [(path, side) for path, side in outputs if not os.path.exists(path)]
+    if not missing:
+        return [path for path, _ in outputs]
+
+    image = load_image(source, max(side for _, side in missing)).image
+    for path, side in sorted(missing, key=lambda output: output[1], reverse=True):
+        # Render from the largest remaining copy to keep each resize cheap
+        image.thumbnail((side, side), Image.LANCZOS, reducing_gap=3.0)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            image.save(temp_path, format=format, quality=quality)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return [path for path, _ in outputs]
@@ -0,0 +1,235 @@
+"""Request body size limits enforced while the body streams in, and request metrics."""
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.file_types import SNIFF_SIZE, matches_extension
+from app.core.metrics import registry
+
+HTTP_REQUESTS = registry.counter("http_requests_total", "HTTP requests handled", ["method", "route", "status"])
+HTTP_DURATION = registry.histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route"])
+
+# (HTTP method, path regex, byte limit)
+SizeRule = Tuple[str, str, int]
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects request bodies over a per-route byte limit.
+
+    A declared Content-Length over the limit is refused before any of the
+    body is read. Bodies without one (chunked transfer) are counted as they
+    arrive and the read is aborted with 413 as soon as the limit is passed,
+    so FastAPI stops parsing and spooling the upload mid-stream.
+    """
+
+    def __init__(self, app: ASGIApp, rules: List[SizeRule]):
+        self.app = app
+        self.rules = [(method.upper(), re.compile(pattern), limit) for method, pattern, limit in rules]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self._limit_for(scope) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": self._detail(limit)}, status_code=413, headers={"connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI re-raises HTTPExceptions from body parsing as-is
+                    raise HTTPException(status_code=413, detail=self._detail(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _limit_for(self, scope: Scope) -> Optional[int]:
+        for method, pattern, limit in self.rules:
+            if scope["method"] == method and pattern.fullmatch(scope["path"]):
+                return limit
+        return None
+
+    @staticmethod
+    def _detail(limit: int) -> str:
+        return f"Upload too large. Maximum size is {limit // (1024*1024)}MB"
+
+
+class MultipartFileCheckMiddleware:
+    """
+    Checks each file in a multipart upload while the body streams in.
+
+    The body is passed to the app untouched and fed, in parallel, to a
+    push parser. A file part whose first bytes do not match its extension is
+    refused with 415, and one that grows past the limit for its extension
+    with 413, as soon as the offending bytes arrive, instead of after the
+    whole request has been spooled to disk. Parts with other extensions pass
+    through for the handler to report.
+    """
+
+    def __init__(self, app: ASGIApp, routes: List[Tuple[str, str]], file_limits: Dict[str, int]):
+        self.app = app
+        self.routes = [(method.upper(), re.compile(pattern)) for method, pattern in routes]
+        self.file_limits = file_limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        boundary = self._boundary(scope) if scope["type"] == "http" and self._matches(scope) else None
+        if boundary is None:
+            await self.app(scope, receive, send)
+            return
+
+        inspector = _PartInspector(self.file_limits)
+        parser = MultipartParser(boundary, inspector.callbacks())
+
+        async def checked_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request" and not inspector.disabled:
+                try:
+                    parser.write(message.get("body", b""))
+                except HTTPException:
+                    raise
+                except Exception:
+                    # Malformed bodies are left for the form parser to reject
+                    inspector.disabled = True
+            return message
+
+        await self.app(scope, checked_receive, send)
+
+    def _matches(self, scope: Scope) -> bool:
+        return any(scope["method"] == method and pattern.fullmatch(scope["path"]) for method, pattern in self.routes)
+
+    @staticmethod
+    def _boundary(scope: Scope) -> Optional[bytes]:
+        content_type = dict(scope["headers"]).get(b"content-type")
+        if not content_type:
+            return None
+        media_type, params = parse_options_header(content_type)
+        if media_type != b"multipart/form-data":
+            return None
+        return params.get(b"boundary")
+
+
+class _PartInspector:
+    """Parser callbacks tracking the file name, leading bytes and size of the current part."""
+
+    def __init__(self, file_limits: Dict[str, int]):
+        self.file_limits = file_limits
+        self.disabled = False
+        self._field = b""
+        self._value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._name = ""
+        self._ext: Optional[str] = None
+        self._head = b""
+        self._size = 0
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._ext = None
+        self._head = b""
+        self._size = 0
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._field.lower()] = self._value
+        self._field = b""
+        self._value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, params = parse_options_header(self._headers.get(b"content-disposition", b""))
+        file_name = params.get(b"filename")
+        if file_name is None:
+            return
+        self._name = file_name.decode("utf-8", "replace")
+        ext = os.path.splitext(self._name)[1].lower()
+        self._ext = ext if ext in self.file_limits else None
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._ext is None:
+            return
+        if len(self._head) < SNIFF_SIZE:
+            self._head += data[start:min(end, start + SNIFF_SIZE - len(self._head))]
+            if len(self._head) >= SNIFF_SIZE:
+                self._check_head()
+        self._size += end - start
+        if self._size > self.file_limits[self._ext]:
+            raise HTTPException(
+                status_code=413,
+                detail=f"{self._name} is too large. Maximum size is {self.file_limits[self._ext] // (1024*1024)}MB",
+            )
+
+    def _on_part_end(self) -> None:
+        if self._ext is not None and len(self._head) < SNIFF_SIZE:
+            self._check_head()
+        self._ext = None
+
+    def _check_head(self) -> None:
+        if not matches_extension(self._ext, self._head):
+            raise HTTPException(status_code=415, detail=f"{self._name}: content does not match type")
+
+
+class MetricsMiddleware:
+    """
+    Counts requests and records their latency per route template.
+
+    Routes are labelled by their template (``/api/v1/events/{event_id}/search``)
+    rather than the raw path, so ids do not create a series per request.
+    Latency runs until the last body chunk is sent, which covers streamed
+    downloads.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(method=scope["method"], route=route_path, status=status)
+            HTTP_DURATION.observe(time.perf_counter() - started, method=scope["method"], route=route_path)
@@ -0,0 +1,251 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters and histograms aggregate in memory behind a lock per metric, so
+recording a sample costs a dict lookup and an addition. With several worker
+processes, set ``metrics_dir`` to a directory local to the host: each process
+periodically writes a snapshot named after its pid there and ``/metrics``
+sums the snapshots of every worker. Snapshots of exited workers, or ones not
+refreshed for ``metrics_stale_after`` seconds, are deleted when scraped.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+
+LabelValues = Tuple[str, ...]
+# A snapshot is {metric name: {"type", "help", "labels", "buckets"?, "samples": [[label values, value], ...]}}
+Snapshot = Dict[str, dict]
+
+
+class Counter:
+    """Monotonic count, e.g. requests or bytes."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = [[list(key), value] for key, value in self._values.items()]
+        return {"type": self.type, "help": self.help, "labels": list(self.labelnames), "samples": samples}
+
+
+class Histogram:
+    """Distribution of observations, e.g. latencies, in cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (last slot is +Inf), sum, count
+        self._values: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the ``with`` block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = [[list(key), [list(counts), total, count]] for key, (counts, total, count) in self._values.items()]
+        return {
+            "type": self.type,
+            "help": self.help,
+            "labels": list(self.labelnames),
+            "buckets": list(self.buckets),
+            "samples": samples,
+        }
+
+
+class Registry:
+    """Holds the process's metrics and renders them for scraping."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        # (callback, metric type) pairs sampled at scrape time
+        self._collectors: List[Tuple[Callable[[], Dict[str, float]], str]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Dict[str, float]], type: str = "gauge") -> None:
+        """
+        Add a callback sampled at scrape time, returning {metric name: value}.
+
+        Gauges are point-in-time values such as queue depths. Use
+        ``type="counter"`` for running totals kept elsewhere, e.g. cache hits,
+        named with a ``_total`` suffix. With several workers the values are
+        summed across processes.
+        """
+        if type not in ("gauge", "counter"):
+            raise ValueError(f"Unsupported collector type: {type}")
+        self._collectors.append((collector, type))
+
+    def snapshot(self) -> Snapshot:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {metric.name: metric.snapshot() for metric in metrics}
+        for collector, type in self._collectors:
+            try:
+                values = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for name, value in values.items():
+                snapshot[name] = {"type": type, "help": name.replace("_", " "), "labels": [], "samples": [[[], value]]}
+        return snapshot
+
+    def write_snapshot(self) -> None:
+        """Publish this process's snapshot to ``metrics_dir`` for other workers to merge."""
+        if not settings.metrics_dir:
+            return
+        os.makedirs(settings.metrics_dir, exist_ok=True)
+        path = os.path.join(settings.metrics_dir, f"{os.getpid()}.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temp_path, path)
+
+    def render(self) -> str:
+        """Prometheus text format for this process, or all workers if ``metrics_dir`` is set."""
+        snapshots = [self.snapshot()]
+        if settings.metrics_dir and os.path.isdir(settings.metrics_dir):
+            own = f"{os.getpid()}.json"
+            cutoff = time.time() - settings.metrics_stale_after
+            for file_name in os.listdir(settings.metrics_dir):
+                if not file_name.endswith((".json", ".json.tmp")) or file_name == own:
+                    continue
+                path = os.path.join(settings.metrics_dir, file_name)
+                try:
+                    if _is_stale(path, file_name, cutoff):
+                        # Left behind by a worker that was killed or restarted
+                        os.remove(path)
+                        continue
+                    if file_name.endswith(".json"):
+                        with open(path) as f:
+                            snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return _render(_merge(snapshots))
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+def _is_stale(path: str, file_name: str, cutoff: float) -> bool:
+    """Whether a snapshot file was last written before ``cutoff`` or by a process that has exited."""
+    if os.stat(path).st_mtime < cutoff:
+        return True
+    try:
+        pid = int(file_name.split(".", 1)[0])
+    except ValueError:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass  # alive, owned by another user
+    return False
+
+
+def _merge(snapshots: List[Snapshot]) -> Snapshot:
+    merged: Snapshot = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = value
+                elif metric["type"] == "histogram":
+                    counts = [a + b for a, b in zip(current[0], value[0])]
+                    target["samples"][key] = [counts, current[1] + value[1], current[2] + value[2]]
+                else:
+                    target["samples"][key] = current + value
+    return merged
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _render(merged: Snapshot) -> str:
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric["samples"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(metric['labels'], labels)} {value}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip([*metric["buckets"], "+Inf"], counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(f"{name}_bucket{_format_labels(metric['labels'], labels, ('le', le))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(metric['labels'], labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(metric['labels'], labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+registry = Registry()
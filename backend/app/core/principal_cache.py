@@ -0,0 +1,60 @@
+"""In-process cache of authenticated users."""
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.models.user import User
+
+
+class PrincipalCache:
+    """
+    LRU + TTL cache of User documents keyed by token subject (email).
+
+    Saves a Mongo lookup on every authenticated request. Routes that change a
+    user's role or active flag must call ``invalidate``; other processes only
+    see such changes once their entry expires, so the TTL bounds staleness.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+
+    def get(self, subject: str) -> Optional[User]:
+        entry = self._entries.get(subject)
+        if entry is None or entry[1] < time.monotonic():
+            if entry is not None:
+                del self._entries[subject]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, subject: str, user: User) -> None:
+        self._entries[subject] = (user, time.monotonic() + self.ttl)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, subject: Optional[str] = None) -> None:
+        """Drop one subject, or every entry if ``subject`` is None."""
+        if subject is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(subject, None)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+principal_cache = PrincipalCache(settings.auth_cache_max_entries, settings.auth_cache_ttl)
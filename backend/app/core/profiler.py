@@ -0,0 +1,176 @@
+"""
+On-demand sampling CPU profiler for selected requests.
+
+An admin arms a session for the next N requests whose path matches a
+pattern. While any of them is in flight, a background thread samples the
+event loop thread's stack every ``interval`` seconds. Once the N-th request
+finishes, the samples are written to ``profile_dir`` in the folded-stack
+format read by flamegraph.pl, speedscope and similar tools.
+
+Sampling reads ``sys._current_frames`` and never stops the loop, so the
+overhead is a stack walk per sample. The loop thread is shared, so samples
+also include other requests served at the same time. Work on the process
+pools is not sampled.
+"""
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.config import settings
+from app.core.executors import run_io
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ProfileSession:
+    """Samples the event loop thread while claimed requests are running."""
+
+    def __init__(self, pattern: str, method: Optional[str], requests: int, interval: float):
+        self.pattern = re.compile(pattern)
+        self.method = method.upper() if method else None
+        self.requests = requests
+        self.interval = interval
+        self.claimed = 0
+        self.completed = 0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = datetime.utcnow()
+        self._active = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._target: Optional[int] = None
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method is None or self.method == method) and self.pattern.search(path) is not None
+
+    @asynccontextmanager
+    async def sample(self) -> AsyncIterator[None]:
+        """Sample the loop thread for the duration of a claimed request."""
+        with self._lock:
+            self._active += 1
+            if self._thread is None:
+                self._target = threading.get_ident()
+                self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self._thread.start()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                self.completed += 1
+                done = self.completed >= self.requests
+            if done:
+                await profiler.finish(self)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def write(self, directory: str) -> Optional[str]:
+        """Write the folded stacks to ``directory``; returns the path, or None without samples."""
+        if not self.stacks:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", self.pattern.pattern).strip("-")[:40] or "all"
+        path = os.path.join(directory, f"{self.started_at:%Y%m%dT%H%M%S%f}-{slug}.folded")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(temp_path, path)
+        return path
+
+    def _sample_loop(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if not self._active:
+                continue
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+
+class RequestProfiler:
+    """Holds the armed profiling session, if any, and the profiles written so far."""
+
+    def __init__(self):
+        self.session: Optional[ProfileSession] = None
+        self.profiles: List[str] = []
+        self._lock = threading.Lock()
+
+    def start(self, pattern: str, method: Optional[str], requests: int, interval: float) -> ProfileSession:
+        """
+        Arm a session for the next ``requests`` matching requests.
+
+        Raises:
+            RuntimeError: if a session is already armed
+            re.error: if ``pattern`` is not a valid regular expression
+        """
+        session = ProfileSession(pattern, method, requests, interval)
+        with self._lock:
+            if self.session is not None:
+                raise RuntimeError("A profiling session is already running")
+            self.session = session
+        logger.info(f"Profiling next {requests} requests matching {pattern}")
+        return session
+
+    def claim(self, method: str, path: str) -> Optional[ProfileSession]:
+        """Return the armed session if it should profile this request."""
+        session = self.session
+        if session is None or not session.matches(method, path):
+            return None
+        with self._lock:
+            if self.session is not session or session.claimed >= session.requests:
+                return None
+            session.claimed += 1
+        return session
+
+    async def finish(self, session: ProfileSession) -> Optional[str]:
+        """Stop a session and write its profile; returns the file path."""
+        with self._lock:
+            if self.session is not session:
+                return None
+            self.session = None
+        path = await run_io(self._write, session)
+        if path:
+            logger.info(f"Wrote profile of {session.completed} requests ({session.samples} samples) to {path}")
+        return path
+
+    def status(self) -> Dict[str, Any]:
+        session = self.session
+        status: Dict[str, Any] = {"active": session is not None, "profiles": list(self.profiles)}
+        if session is not None:
+            status.update({
+                "route": session.pattern.pattern,
+                "method": session.method,
+                "requests": session.requests,
+                "completed": session.completed,
+                "samples": session.samples,
+                "interval": session.interval,
+            })
+        return status
+
+    def _write(self, session: ProfileSession) -> Optional[str]:
+        session.stop()
+        path = session.write(settings.profile_dir)
+        if path:
+            with self._lock:
+                self.profiles = [*self.profiles, path][-20:]
+        return path
+
+
+profiler = RequestProfiler()
@@ -1,11 +1,28 @@
+import asyncio
+import math
+import time
+from collections import deque
 from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.config import settings
+from app.core.executors import get_password_executor
 
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+def _build_context() -> CryptContext:
+    schemes = [scheme.strip() for scheme in settings.password_schemes.split(",") if scheme.strip()]
+    options = {}
+    if settings.password_hash_rounds:
+        # Pin the cost so hashes made with any other rounds count as outdated
+        for option in ("default_rounds", "min_rounds", "max_rounds"):
+            options[f"{schemes[0]}__{option}"] = settings.password_hash_rounds
+    # Hashes from older schemes, or with other rounds, are flagged for rehashing
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
+pwd_context = _build_context()
 
 ALGORITHM = settings.jwt_algorithm
 
@@ -52,4 +69,97 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+def _timed_hash(password: str) -> Tuple[str, float]:
+    started = time.perf_counter()
+    return pwd_context.hash(password), time.perf_counter() - started
+
+
+def _timed_verify(password: str, hashed_password: str) -> Tuple[Tuple[bool, Optional[str]], float]:
+    started = time.perf_counter()
+    return pwd_context.verify_and_update(password, hashed_password), time.perf_counter() - started
+
+
+def _percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a dedicated process pool.
+
+    At most ``password_hash_max_pending`` hashes are queued or running; beyond
+    that requests are shed with 429 and a Retry-After estimated from recent
+    hash times, instead of piling up behind a burst of logins.
+    """
+
+    def __init__(self):
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._hash_seconds: deque = deque(maxlen=1000)
+        self._wait_seconds: deque = deque(maxlen=1000)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_timed_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password against its stored hash.
+
+        Returns:
+            (matches, replacement hash or None); a replacement is returned
+            when the stored hash uses an outdated scheme or cost
+        """
+        valid, new_hash = await self._run(_timed_verify, password, hashed_password)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        average = sum(self._hash_seconds) / len(self._hash_seconds) if self._hash_seconds else 0.5
+        return max(1, math.ceil(self.pending * average / settings.password_hash_workers))
+
+    def stats(self) -> Dict[str, Any]:
+        hash_seconds = list(self._hash_seconds)
+        wait_seconds = list(self._wait_seconds)
+        return {
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "hash_seconds_p50": _percentile(hash_seconds, 0.5),
+            "hash_seconds_p95": _percentile(hash_seconds, 0.95),
+            "queue_seconds_p50": _percentile(wait_seconds, 0.5),
+            "queue_seconds_p95": _percentile(wait_seconds, 0.95),
+        }
+
+    async def _run(self, func, *args):
+        if self.pending >= settings.password_hash_max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many sign-ins in progress, please retry shortly",
+                headers={"Retry-After": str(self.retry_after())},
+            )
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, hash_seconds = await loop.run_in_executor(get_password_executor(), func, *args)
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self._hash_seconds.append(hash_seconds)
+        self._wait_seconds.append(max(0.0, time.perf_counter() - started - hash_seconds))
+        return result
+
+
+password_hasher = PasswordHasher()
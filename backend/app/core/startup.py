@@ -0,0 +1,91 @@
+"""Application startup: connect backing services concurrently within a time budget."""
+import asyncio
+import time
+from typing import Awaitable, Dict, List
+
+from app.config import settings
+from app.core.database import db, init_mongo, init_pinecone
+from app.core.executors import run_io
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class StartupReport:
+    """Per-phase timings and the optional services that were not ready."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.degraded: List[str] = []
+        self.pending: List[asyncio.Task] = []
+
+    @property
+    def total(self) -> float:
+        return self.phases.get("total", 0.0)
+
+
+async def _timed(report: StartupReport, phase: str, work: Awaitable) -> None:
+    started = time.perf_counter()
+    try:
+        await work
+    finally:
+        report.phases[phase] = round(time.perf_counter() - started, 3)
+        logger.info("startup_phase", phase=phase, seconds=report.phases[phase])
+
+
+def _recovered(report: StartupReport, service: str, task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is None and service in report.degraded:
+        report.degraded.remove(service)
+        logger.info(f"{service} became ready after startup")
+
+
+async def init_vector_store() -> None:
+    """Connect Pinecone or load local index shards, depending on vector_backend."""
+    from app.services.vector_store import vector_store
+
+    if settings.vector_backend.lower() == "pinecone":
+        await run_io(init_pinecone)
+        if db.pinecone_index is None:
+            raise RuntimeError("Pinecone index not available")
+    await run_io(vector_store.get_backend)
+
+
+async def start_services() -> StartupReport:
+    """
+    Connect MongoDB and the vector store concurrently, each exactly once.
+
+    MongoDB is required: failing to connect, or not connecting within
+    ``startup_timeout``, aborts startup. The vector store is optional: if it
+    fails or is still connecting when the budget runs out, the app boots
+    degraded, search calls reconnect lazily, and a slow connect carries on in
+    the background.
+
+    Returns:
+        Report of phase timings and degraded services
+    """
+    report = StartupReport()
+    started = time.perf_counter()
+    mongo = asyncio.create_task(_timed(report, "mongo", init_mongo()))
+    vectors = asyncio.create_task(_timed(report, "vector_store", init_vector_store()))
+
+    await asyncio.wait({mongo, vectors}, timeout=settings.startup_timeout)
+
+    if not mongo.done():
+        mongo.cancel()
+        vectors.cancel()
+        raise RuntimeError(f"MongoDB not ready within {settings.startup_timeout}s")
+    if mongo.exception() is not None:
+        vectors.cancel()
+        raise mongo.exception()
+
+    if not vectors.done():
+        logger.warning(f"Vector store not ready within {settings.startup_timeout}s; starting degraded")
+        report.degraded.append("vector_store")
+        report.pending.append(vectors)
+        vectors.add_done_callback(lambda task: _recovered(report, "vector_store", task))
+    elif vectors.exception() is not None:
+        logger.warning(f"Vector store unavailable, starting degraded: {vectors.exception()}")
+        report.degraded.append("vector_store")
+
+    report.phases["connect"] = round(time.perf_counter() - started, 3)
+    return report
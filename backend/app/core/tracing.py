@@ -0,0 +1,127 @@
+"""
+Request-scoped tracing.
+
+Every request gets an id (taken from ``X-Request-ID`` or generated) that is
+bound with ``structlog.contextvars``, so each log line written while serving
+it, including from background jobs it starts, carries the request id, event
+id and user. ``span`` times a stage and adds it to the current trace; the
+per-stage totals are logged when the request finishes, at INFO once it takes
+longer than ``trace_slow_request`` seconds.
+"""
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+import structlog
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.core.profiler import profiler
+
+logger = get_logger(__name__)
+
+# Stage name -> [calls, total seconds] for the trace being recorded
+Stages = Dict[str, List[float]]
+
+_stages: ContextVar[Optional[Stages]] = ContextVar("trace_stages", default=None)
+
+_EVENT_PATH = re.compile(r"/api/v1/events/([^/]+)")
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+def bind(**fields) -> None:
+    """Attach fields, e.g. ``user_id``, to every log line for the rest of the request."""
+    structlog.contextvars.bind_contextvars(**fields)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add a timing to the current trace; a no-op outside one."""
+    stages = _stages.get()
+    if stages is None:
+        return
+    entry = stages.setdefault(name, [0, 0.0])
+    entry[0] += 1
+    entry[1] += seconds
+
+
+@contextmanager
+def span(name: str, **fields) -> Iterator[None]:
+    """
+    Time the ``with`` block as a stage of the current trace.
+
+    Spans of the same name are summed, so a stage run per file reports its
+    call count and total time. Each span is also logged at DEBUG.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        record(name, elapsed)
+        logger.debug("span", span=name, duration=round(elapsed, 4), **fields)
+
+
+@contextmanager
+def trace() -> Iterator[Stages]:
+    """Start a new trace for the ``with`` block and yield its stage totals."""
+    stages: Stages = {}
+    token = _stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _stages.reset(token)
+
+
+def summarize(stages: Stages) -> Dict[str, Dict[str, float]]:
+    """Stage totals in a loggable form."""
+    return {name: {"calls": int(calls), "seconds": round(total, 4)} for name, (calls, total) in stages.items()}
+
+
+class TracingMiddleware:
+    """
+    Binds the request id, method, path and event id for the request's logs,
+    echoes the id in an ``X-Request-ID`` response header, and runs requests
+    selected by the profiler under it.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = header if _REQUEST_ID.fullmatch(header) else uuid.uuid4().hex
+        fields = {"request_id": request_id, "method": scope["method"], "path": scope["path"]}
+        event_match = _EVENT_PATH.match(scope["path"])
+        if event_match:
+            fields["event_id"] = event_match.group(1)
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode())]
+            await send(message)
+
+        session = profiler.claim(scope["method"], scope["path"])
+        started = time.perf_counter()
+        with structlog.contextvars.bound_contextvars(**fields), trace() as stages:
+            try:
+                if session is None:
+                    await self.app(scope, receive, send_wrapper)
+                else:
+                    async with session.sample():
+                        await self.app(scope, receive, send_wrapper)
+            finally:
+                duration = time.perf_counter() - started
+                log = logger.info if duration >= settings.trace_slow_request else logger.debug
+                log("request_finished", status=status, duration=round(duration, 4), stages=summarize(stages))
@@ -1,42 +1,94 @@
 # backend/main.py
+import asyncio
+import os
+import time
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator, List, Dict
 
+from beanie import PydanticObjectId
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 from app.config import settings
 from app.core.logging import configure_logging, get_logger
-from app.core.database import init_db, db, init_pinecone
+from app.core.database import db
+from app.core.executors import run_io, shutdown_executors
+from app.core.limits import BodySizeLimitMiddleware, MetricsMiddleware, MultipartFileCheckMiddleware
+from app.core.metrics import registry
+from app.core.startup import start_services
+from app.core.tracing import TracingMiddleware
+from app.models.event import Event
+from app.services.blob_sweeper import blob_sweeper
+from app.services.face_indexer import face_indexer
+from app.services.ingest_service import ingest_service
+from app.services.selfie_encoder import selfie_encoder
+from app.services.thumbnail_service import thumbnail_service
+from app.services.vector_store import vector_store
 from app.routes.health import router as health_router
-from app.routes import auth, users
-from app.core.pinecone_client import index  # Pinecone index
+from app.routes.metrics import router as metrics_router
+from app.routes import admin, auth, users
 
 logger = get_logger(__name__)
 
+
+async def _flush_metrics() -> None:
+    """Publish this worker's metrics for ``/metrics`` on the other workers."""
+    while True:
+        await asyncio.sleep(settings.metrics_flush_interval)
+        try:
+            await run_io(registry.write_snapshot)
+        except Exception as e:
+            logger.warning(f"Writing metrics snapshot failed: {e}")
+
 # -----------------------------
 # Lifespan for FastAPI
 # -----------------------------
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    started = time.perf_counter()
     configure_logging(settings.log_level)
-    await init_db()            # Initialize MongoDB + Beanie
-    init_pinecone()            # Initialize Pinecone index
-
-    mongo_status = "Connected" if db.client else "Failed"
-    pinecone_status = "Connected" if index else "Not Configured/Failed"
+    report = await start_services()  # MongoDB + vector store, concurrently
+
+    phase_started = time.perf_counter()
+    await face_indexer.start()
+    ingest_service.register_processor(thumbnail_service.process)
+    ingest_service.register_processor(face_indexer.process)
+    await ingest_service.start()
+    await blob_sweeper.start()
+    report.phases["workers"] = round(time.perf_counter() - phase_started, 3)
+    report.phases["total"] = round(time.perf_counter() - started, 3)
+    app.state.startup = report
+    metrics_task = asyncio.create_task(_flush_metrics()) if settings.metrics_dir else None
 
     logger.info(
         "application_startup",
         app_name=settings.app_name,
         environment=settings.environment,
-        mongo_status=mongo_status,
-        pinecone_vector_db=pinecone_status,
+        mongo_status="Connected" if db.client else "Failed",
+        vector_backend=settings.vector_backend,
+        degraded=report.degraded,
+        phases=report.phases,
     )
 
     yield
 
+    for task in report.pending:
+        task.cancel()
+    if metrics_task is not None:
+        metrics_task.cancel()
+    await ingest_service.stop()
+    await blob_sweeper.stop()
+    await face_indexer.stop()
+    await selfie_encoder.stop()
+    vector_store.close()
+    shutdown_executors()
+    if settings.metrics_dir:
+        # Drop this worker's snapshot so a restarted pool does not double count
+        try:
+            os.remove(os.path.join(settings.metrics_dir, f"{os.getpid()}.json"))
+        except OSError:
+            pass
     logger.info("application_shutdown")
 
 
@@ -50,6 +102,31 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+app.add_middleware(
+    MultipartFileCheckMiddleware,
+    routes=[("POST", r"/api/v1/events/[^/]+/upload")],
+    file_limits={
+        ".jpg": settings.max_file_size,
+        ".jpeg": settings.max_file_size,
+        ".png": settings.max_file_size,
+        ".zip": settings.max_upload_size,
+    },
+)
+
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    rules=[
+        ("POST", r"/api/v1/events/[^/]+/upload", settings.max_upload_size),
+        ("PUT", r"/api/v1/events/[^/]+/uploads/[^/]+", settings.resumable_max_chunk_size),
+        # Selfie plus form overhead
+        ("POST", r"/api/v1/events/[^/]+/search", settings.max_selfie_size + 64 * 1024),
+    ],
+)
+
+app.add_middleware(MetricsMiddleware)
+
+app.add_middleware(TracingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
@@ -62,10 +139,18 @@ app.add_middleware(
 # Routers
 # -----------------------------
 app.include_router(health_router, tags=["Health"])
+app.include_router(metrics_router, tags=["Health"])
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 from app.routes import media
 app.include_router(media.router, prefix="/api/v1/events", tags=["Media"])
+from app.routes import uploads
+app.include_router(uploads.router, prefix="/api/v1/events", tags=["Media"])
+from app.routes import search as event_search
+app.include_router(event_search.router, prefix="/api/v1/events", tags=["Search"])
+from app.routes import files
+app.include_router(files.router, prefix="/api/v1/events", tags=["Media"])
 
 # -----------------------------
 # Root Endpoint
@@ -83,12 +168,14 @@ async def root() -> dict[str, str]:
 # -----------------------------
 @app.get("/search")
 async def search():
-    if not index:
-        raise HTTPException(status_code=500, detail="Pinecone not initialized")
-    
     # Use correct embedding dimension
-    query_vector = [0.1] * 128
-    result = index.query(vector=query_vector, top_k=5)
+    query_vector = [0.1] * settings.vector_dimension
+    try:
+        result = await vector_store.query_vectors_async(query_vector, top_k=5)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Vector store timed out")
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
     return result
 
 # -----------------------------
@@ -100,13 +187,19 @@ class VectorItem(BaseModel):
     metadata: Dict[str, str] = {}
 
 @app.post("/push")
-async def push_vectors(vectors: List[VectorItem]):
-    if not index:
-        raise HTTPException(status_code=500, detail="Pinecone not initialized")
+async def push_vectors(event_id: str, vectors: List[VectorItem]):
+    """Upsert raw vectors into an event's partition, where its search looks for them."""
+    event = await Event.get(event_id) if PydanticObjectId.is_valid(event_id) else None
+    if not event:
+        raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
     try:
-        to_upsert = [(v.id, v.values, v.metadata) for v in vectors]
-        # Use await if your Pinecone client supports async upsert
-        await index.upsert(vectors=to_upsert)
-        return {"status": "success", "count": len(vectors)}
+        to_upsert = [(v.id, v.values, {**v.metadata, "event_id": event_id}) for v in vectors]
+        result = await vector_store.bulk_upsert(to_upsert, event_id=event_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "status": "success" if not result.failed_count else "partial",
+        "count": result.upserted_count,
+        "failed_count": result.failed_count,
+        "batches": result.batch_count,
+    }
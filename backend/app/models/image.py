@@ -1,17 +1,33 @@
 from datetime import datetime
+from enum import Enum
 from typing import Optional
-from beanie import Document, Indexed, Link
-from pydantic import Field
+from beanie import Document, Indexed, Link, PydanticObjectId
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, IndexModel
 from app.models.user import User
 from app.models.event import Event
 
+class ImageStatus(str, Enum):
+    UPLOADED = "UPLOADED"
+    PROCESSING = "PROCESSING"
+    INDEXED = "INDEXED"
+    FAILED = "FAILED"
+
 class ImageMetadata(Document):
     event_id: Link[Event]
     file_name: str
     file_path: str
+    content_hash: Optional[str] = None  # sha256 of the stored blob
+    file_size: Optional[int] = None
+    width: Optional[int] = None  # pixels, read from the file header at upload
+    height: Optional[int] = None
     upload_timestamp: datetime = Field(default_factory=datetime.utcnow)
-    status: str = "UPLOADED"
+    status: str = ImageStatus.UPLOADED.value
+    processing_started_at: Optional[datetime] = None  # when a worker last claimed the image
     photographer_id: Link[User]
+    job_id: Optional[str] = None
+    thumbnail_path: Optional[str] = None  # small grid thumbnail
+    preview_path: Optional[str] = None  # medium-size preview
 
     class Settings:
         name = "image_metadata"
@@ -20,4 +36,34 @@ class ImageMetadata(Document):
             "photographer_id",
             "upload_timestamp",
             "status",
+            "job_id",
+            "content_hash",
+            # Each piece of content is stored once per event
+            IndexModel(
+                [("event_id", ASCENDING), ("content_hash", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"content_hash": {"$type": "string"}},
+            ),
         ]
+
+class ImageSearchView(BaseModel):
+    """Projection of ImageMetadata returned by search; skips Link fields."""
+    id: PydanticObjectId = Field(alias="_id")
+    file_name: str
+    upload_timestamp: datetime
+    content_hash: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+class ImageFileView(BaseModel):
+    """Projection of ImageMetadata used to serve stored files."""
+    id: PydanticObjectId = Field(alias="_id")
+    file_name: str
+    file_path: str
+    content_hash: Optional[str] = None
+    thumbnail_path: Optional[str] = None
+    preview_path: Optional[str] = None
+
+class ImageHashView(BaseModel):
+    """Projection of ImageMetadata used to find referenced blobs."""
+    content_hash: Optional[str] = None
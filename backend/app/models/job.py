@@ -0,0 +1,31 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+from beanie import Document
+from pydantic import Field
+
+class JobStatus(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+class IngestJob(Document):
+    event_id: str
+    photographer_id: str
+    file_names: List[str] = Field(default_factory=list)
+    status: JobStatus = JobStatus.QUEUED
+    total_uploaded: int = 0
+    duplicate_count: int = 0
+    failed_files: List[str] = Field(default_factory=list)
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "ingest_jobs"
+        indexes = [
+            "event_id",
+            "status",
+            "created_at",
+        ]
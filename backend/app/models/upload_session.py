@@ -0,0 +1,34 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from beanie import Document
+from pydantic import Field
+
+class UploadSessionStatus(str, Enum):
+    OPEN = "OPEN"
+    COMPLETED = "COMPLETED"
+    ABORTED = "ABORTED"
+    EXPIRED = "EXPIRED"  # abandoned for longer than resumable_session_ttl
+
+class UploadSession(Document):
+    """A resumable upload of one file, written chunk by chunk to ``part_path``."""
+    event_id: str
+    photographer_id: str
+    file_name: str
+    total_size: int
+    received: int = 0  # bytes written so far; the next chunk must start here
+    writer: Optional[str] = None  # token of the request currently writing a chunk
+    writer_expires: Optional[datetime] = None  # when that request's claim lapses
+    part_path: str
+    status: UploadSessionStatus = UploadSessionStatus.OPEN
+    job_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "upload_sessions"
+        indexes = [
+            "event_id",
+            "photographer_id",
+            "status",
+        ]
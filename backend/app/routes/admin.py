@@ -0,0 +1,47 @@
+import re
+from fastapi import APIRouter, Depends, HTTPException
+from app.api.deps import RoleChecker
+from app.config import settings
+from app.core.profiler import profiler
+from app.schemas.admin import ProfilingStart, ProfilingStatus
+
+router = APIRouter(dependencies=[Depends(RoleChecker(["admin"]))])
+
+@router.post("/profiling", response_model=ProfilingStatus, status_code=201)
+async def start_profiling(profile_in: ProfilingStart):
+    """
+    Capture a sampling CPU profile of the next ``requests`` requests whose
+    path matches ``route``. Only for admins.
+
+    The profile is written to ``profile_dir`` as folded stacks once the last
+    request finishes; its path is listed by GET /admin/profiling.
+    """
+    if profile_in.requests > settings.profile_max_requests:
+        raise HTTPException(status_code=422, detail=f"At most {settings.profile_max_requests} requests per profile")
+    try:
+        profiler.start(profile_in.route, profile_in.method, profile_in.requests, profile_in.interval)
+    except re.error as e:
+        raise HTTPException(status_code=422, detail=f"Invalid route pattern: {e}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiler.status()
+
+
+@router.get("/profiling", response_model=ProfilingStatus)
+async def profiling_status():
+    """
+    Progress of the running profile and paths of recent profiles. Only for admins.
+    """
+    return profiler.status()
+
+
+@router.delete("/profiling", response_model=ProfilingStatus)
+async def stop_profiling():
+    """
+    Stop the running profile early, writing the samples taken so far. Only for admins.
+    """
+    session = profiler.session
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session is running")
+    await profiler.finish(session)
+    return profiler.status()
@@ -1,8 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordRequestForm
 from app.models.user import User
-from app.core.security import create_access_token, verify_password, hash_password
-from passlib.context import CryptContext
+from app.core.security import create_access_token, password_hasher
 
 router = APIRouter()
 
@@ -18,7 +17,7 @@ async def register(email: str, password: str, role: str = "user"):
         )
 
     # Hash the password
-    hashed_pw = hash_password(password)
+    hashed_pw = await password_hasher.hash(password)
 
     # Create user object
     user = User(email=email, hashed_password=hashed_pw, role=role)
@@ -43,14 +42,20 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             detail="Invalid credentials"
         )
 
-    if not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
 
+    # Upgrade hashes made with an old scheme or cost while we have the password
+    if new_hash:
+        await user.set({User.hashed_password: new_hash})
+
     token = create_access_token({
         "sub": user.email,
+        "uid": str(user.id),
         "role": user.role
     })
 
@@ -66,9 +71,7 @@ async def login_test(form_data: OAuth2PasswordRequestForm = Depends()):
     if not user:
         return {"status": "no user found", "email": form_data.username}
 
-    # Use same scheme as your hashed passwords
-    pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
-    result = pwd_context.verify(form_data.password, user.hashed_password)
+    result, _ = await password_hasher.verify(form_data.password, user.hashed_password)
 
     return {
         "status": "user found",
@@ -0,0 +1,154 @@
+import asyncio
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from enum import Enum
+from beanie import PydanticObjectId
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from app.api.deps import get_current_active_user
+from app.config import settings
+from app.core.executors import run_io
+from app.models.image import ImageFileView, ImageMetadata
+from app.models.event import Event
+from app.models.user import User
+from app.schemas.media import DownloadRequest
+from app.services.download_service import download_service
+from app.services.search_service import InvalidCursor, search_service
+
+router = APIRouter()
+
+
+class MediaVariant(str, Enum):
+    ORIGINAL = "original"
+    PREVIEW = "preview"
+    THUMBNAIL = "thumbnail"
+
+
+@router.get("/{event_id}/images/{image_id}/{variant}")
+async def get_image_file(
+    event_id: str,
+    image_id: str,
+    variant: MediaVariant,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Serve a stored photo or one of its thumbnails.
+
+    Supports Range requests, answers If-None-Match/If-Modified-Since with 304,
+    and marks responses as cacheable for a long time since stored paths are
+    content-addressed. The body is streamed from disk, or handed to the server
+    with the ASGI pathsend extension where the server supports it.
+    """
+    try:
+        query = {"_id": ObjectId(image_id), "event_id.$id": ObjectId(event_id)}
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Image not found")
+    image = await ImageMetadata.find_one(query, projection_model=ImageFileView)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    path = {
+        MediaVariant.ORIGINAL: image.file_path,
+        MediaVariant.PREVIEW: image.preview_path,
+        MediaVariant.THUMBNAIL: image.thumbnail_path,
+    }[variant]
+    if not path or not _is_stored_path(path):
+        raise HTTPException(status_code=404, detail=f"No {variant.value} for image {image_id}")
+    try:
+        stat = await run_io(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No {variant.value} for image {image_id}")
+
+    if variant == MediaVariant.ORIGINAL:
+        # An image's original never changes, so its content hash is a strong validator
+        version = image.content_hash or f"{int(stat.st_mtime)}-{stat.st_size}"
+        cache_control = f"private, max-age={settings.media_cache_max_age}, immutable"
+    else:
+        # Rendition files are named by hash, size and format; re-rendering with
+        # new settings points the same URL at a new file, so clients revalidate
+        version = os.path.splitext(os.path.basename(path))[0]
+        cache_control = f"private, max-age={settings.media_derived_max_age}"
+    headers = {
+        "etag": f'"{version}-{variant.value}"',
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "cache-control": cache_control,
+    }
+    if _not_modified(request, headers["etag"], stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    name, _ = os.path.splitext(image.file_name)
+    _, ext = os.path.splitext(path)
+    return FileResponse(
+        path,
+        stat_result=stat,
+        headers=headers,
+        media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+        filename=image.file_name if variant == MediaVariant.ORIGINAL else f"{name}_{variant.value}{ext}",
+        content_disposition_type="inline",
+    )
+
+
+@router.post("/{event_id}/download")
+async def download_images(
+    event_id: str,
+    request: DownloadRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Download photos as a ZIP archive generated while it streams.
+
+    Pass ``image_ids`` or a search ``cursor``; a cursor downloads every match
+    of that search, not just the current page.
+    """
+    event = await Event.get(event_id) if PydanticObjectId.is_valid(event_id) else None
+    if not event:
+        raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
+
+    image_ids = list(request.image_ids)
+    if request.cursor:
+        try:
+            vectors, _ = search_service.decode_cursor(event_id, request.cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            ranked = await search_service.rank(event_id, vectors)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Vector store timed out")
+        image_ids.extend(image_id for image_id, _, _ in ranked)
+    if not image_ids:
+        raise HTTPException(status_code=422, detail="Provide image_ids or a cursor")
+    if len(image_ids) > settings.download_max_images:
+        raise HTTPException(status_code=422, detail=f"At most {settings.download_max_images} photos per download")
+
+    images = await download_service.resolve_images(event_id, image_ids)
+    if not images:
+        raise HTTPException(status_code=404, detail="No photos found")
+
+    return StreamingResponse(
+        download_service.iter_archive(images),
+        media_type="application/zip",
+        headers={"content-disposition": f'attachment; filename="event-{event_id}-photos.zip"'},
+    )
+
+
+def _is_stored_path(path: str) -> bool:
+    root = os.path.realpath(settings.upload_dir)
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
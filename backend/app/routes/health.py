@@ -1,15 +1,59 @@
 """Health check endpoint for monitoring and uptime checks."""
-from fastapi import APIRouter
+from typing import Any
+
+from fastapi import APIRouter, Request
+
+from app.core.principal_cache import principal_cache
+from app.core.security import password_hasher
+from app.services.face_indexer import face_indexer
+from app.services.selfie_encoder import selfie_encoder
 
 router = APIRouter(tags=["health"])
 
 
 @router.get("/health")
-async def health_check() -> dict[str, str]:
+async def health_check(request: Request) -> dict[str, Any]:
     """
     Health check endpoint.
     
     Returns:
-        Dictionary with status indicating the service is healthy
+        Dictionary with status "healthy", or "degraded" plus the optional
+        services that are unavailable
     """
+    report = getattr(request.app.state, "startup", None)
+    if report is not None and report.degraded:
+        return {"status": "degraded", "degraded": report.degraded}
     return {"status": "healthy"}
+
+
+@router.get("/health/ingest")
+async def ingest_health() -> dict[str, Any]:
+    """
+    Face embedding stage metrics.
+
+    Returns:
+        Queue depth (images waiting and batched) and throughput in faces/s
+    """
+    return await face_indexer.stats()
+
+
+@router.get("/health/search")
+async def search_health() -> dict[str, Any]:
+    """
+    Selfie encoder metrics.
+
+    Returns:
+        Pending selfies, batches in flight and mean batch size
+    """
+    return selfie_encoder.stats()
+
+
+@router.get("/health/auth")
+async def auth_health() -> dict[str, Any]:
+    """
+    Password hashing and principal cache metrics.
+
+    Returns:
+        Hash queue depth, latency percentiles, shed requests and cache hit rate
+    """
+    return {"password_hashing": password_hasher.stats(), "principal_cache": principal_cache.stats()}
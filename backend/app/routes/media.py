@@ -1,10 +1,12 @@
 from typing import List
+from beanie import Link, PydanticObjectId
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Security
 from app.api.deps import get_current_active_user, RoleChecker
 from app.models.user import User
 from app.models.event import Event
-from app.schemas.media import UploadResponse, ErrorResponse
-from app.services.upload_service import upload_service
+from app.models.job import IngestJob
+from app.schemas.media import IngestJobResponse, ErrorResponse
+from app.services.ingest_service import ingest_service
 from app.config import settings
 from app.api.deps import oauth2_scheme
 
@@ -13,7 +15,7 @@ router = APIRouter()
 
 allow_photographer = RoleChecker(["photographer", "admin"])
 
-@router.post("/{event_id}/upload", response_model=UploadResponse, status_code=201)
+@router.post("/{event_id}/upload", response_model=IngestJobResponse, status_code=202)
 async def bulk_upload(
     event_id: str,
     request: Request,
@@ -24,6 +26,8 @@ async def bulk_upload(
     """
     Bulk upload images or ZIP files for a specific event.
     Requires photographer or admin role.
+
+    Files are processed in the background; poll the returned job for progress.
     """
     # 1. Validate Content-Length if present
     content_length = request.headers.get("content-length")
@@ -34,25 +38,58 @@ async def bulk_upload(
         )
 
     # 2. Check if event exists
-    event = await Event.get(event_id)
+    event = await Event.get(event_id) if PydanticObjectId.is_valid(event_id) else None
     if not event:
         raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
 
-    # 3. Process uploads via service
-    total_uploaded, failed_files = await upload_service.handle_uploads(
+    # 3. Queue uploads for background processing
+    job = await ingest_service.submit(
         event_id=event_id,
         files=files,
         photographer_id=str(current_user.id)
     )
 
-    if total_uploaded == 0 and failed_files:
-        raise HTTPException(status_code=400, detail=f"Failed to upload any files: {', '.join(failed_files)}")
+    return _job_response(job, {})
 
-    return UploadResponse(
-        event_id=event_id,
-        total_uploaded=total_uploaded,
-        failed_files=failed_files,
-        status="UPLOAD_COMPLETED"
+@router.get("/{event_id}/jobs/{job_id}", response_model=IngestJobResponse)
+async def get_upload_job(
+    event_id: str,
+    job_id: str,
+    current_user: User = Security(allow_photographer)
+):
+    """
+    Get the status of a background upload job.
+    Visible to the photographer who uploaded it, the event's owner and admins.
+    """
+    job = await IngestJob.get(job_id) if PydanticObjectId.is_valid(job_id) else None
+    if not job or job.event_id != event_id or not await _can_view_job(job, current_user):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    counts = await ingest_service.get_status_counts(job_id)
+    return _job_response(job, counts)
+
+async def _can_view_job(job: IngestJob, user: User) -> bool:
+    if user.role.lower() == "admin" or job.photographer_id == str(user.id):
+        return True
+    event = await Event.get(job.event_id) if PydanticObjectId.is_valid(job.event_id) else None
+    if not event:
+        return False
+    owner = event.photographer_id
+    owner_id = owner.ref.id if isinstance(owner, Link) else owner.id
+    return str(owner_id) == str(user.id)
+
+def _job_response(job: IngestJob, counts: dict) -> IngestJobResponse:
+    return IngestJobResponse(
+        job_id=str(job.id),
+        event_id=job.event_id,
+        status=job.status,
+        total_uploaded=job.total_uploaded,
+        duplicate_count=job.duplicate_count,
+        failed_files=job.failed_files,
+        image_status_counts=counts,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
     )
 
 # Helper route to create an event
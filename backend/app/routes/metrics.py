@@ -0,0 +1,60 @@
+"""Prometheus scrape endpoint."""
+from typing import Dict
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.executors import run_io
+from app.core.metrics import registry
+from app.core.principal_cache import principal_cache
+from app.core.security import password_hasher
+from app.services.face_indexer import face_indexer
+from app.services.selfie_encoder import selfie_encoder
+from app.services.vector_store import vector_store
+
+router = APIRouter()
+
+
+def _queue_depths() -> Dict[str, float]:
+    gauges = {
+        "face_indexer_pending_images": face_indexer.batcher.pending,
+        "face_indexer_batches_in_flight": face_indexer.batcher.in_flight,
+        "selfie_encoder_pending": selfie_encoder.batcher.pending,
+        "selfie_encoder_batches_in_flight": selfie_encoder.batcher.in_flight,
+        "password_hash_pending": password_hasher.pending,
+        "principal_cache_entries": principal_cache.stats()["entries"],
+    }
+    cache = vector_store.get_cache()
+    if cache is not None:
+        stats = cache.stats()
+        gauges.update({
+            "search_cache_entries": stats["entries"],
+            "search_cache_bytes": stats["bytes"],
+        })
+    return gauges
+
+
+def _cache_lookups() -> Dict[str, float]:
+    counters = {
+        "principal_cache_hits_total": principal_cache.hits,
+        "principal_cache_misses_total": principal_cache.misses,
+    }
+    cache = vector_store.get_cache()
+    if cache is not None:
+        stats = cache.stats()
+        counters.update({
+            "search_cache_hits_total": stats["hits"],
+            "search_cache_misses_total": stats["misses"],
+            "search_cache_evictions_total": stats["evictions"],
+        })
+    return counters
+
+
+registry.register_collector(_queue_depths)
+registry.register_collector(_cache_lookups, type="counter")
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Metrics in Prometheus text format, summed over all workers when ``metrics_dir`` is set."""
+    return PlainTextResponse(await run_io(registry.render), media_type="text/plain; version=0.0.4")
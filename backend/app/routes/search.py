@@ -0,0 +1,78 @@
+import asyncio
+import json
+from typing import Optional
+import numpy as np
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from app.api.deps import get_current_active_user
+from app.config import settings
+from app.models.event import Event
+from app.models.user import User
+from app.schemas.media import SearchResponse
+from app.services.search_service import InvalidCursor, search_service
+
+router = APIRouter()
+
+@router.post("/{event_id}/search", response_model=SearchResponse)
+async def search_event(
+    event_id: str,
+    selfie: Optional[UploadFile] = File(None),
+    embedding: Optional[str] = Form(None),
+    cursor: Optional[str] = Form(None),
+    limit: int = Form(settings.search_page_size, ge=1, le=200),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Find an event's photos that contain a face.
+
+    Send either a selfie image or precomputed embeddings (a JSON array, or an
+    array of arrays for several faces) for the first page, then only the
+    returned ``next_cursor`` for later pages. Every face in a group selfie is
+    searched at once and photos containing more of them rank first.
+    """
+    if cursor:
+        try:
+            vectors, offset = search_service.decode_cursor(event_id, cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        offset = 0
+        if embedding:
+            try:
+                vectors = np.atleast_2d(np.asarray(json.loads(embedding), dtype=np.float32))
+            except (ValueError, TypeError):
+                raise HTTPException(status_code=422, detail="Embedding must be a JSON array of numbers")
+            if vectors.ndim != 2 or vectors.shape[1] != settings.vector_dimension or len(vectors) == 0:
+                raise HTTPException(status_code=422, detail=f"Embedding must have {settings.vector_dimension} values")
+            if len(vectors) > settings.search_max_faces:
+                raise HTTPException(status_code=422, detail=f"At most {settings.search_max_faces} embeddings per search")
+        elif selfie:
+            data = await selfie.read(settings.max_selfie_size + 1)
+            if len(data) > settings.max_selfie_size:
+                raise HTTPException(status_code=413, detail="Selfie too large")
+            try:
+                faces = await search_service.embed_selfie(data)
+            except Exception:
+                raise HTTPException(status_code=422, detail="Could not read selfie image")
+            if len(faces) == 0:
+                raise HTTPException(status_code=422, detail="No face found in selfie")
+            vectors = faces[:settings.search_max_faces]
+        else:
+            raise HTTPException(status_code=422, detail="Provide a selfie, an embedding or a cursor")
+        # Match the precision stored in cursors so every page runs the same query
+        vectors = vectors.astype(np.float16).astype(np.float32)
+
+    event = await Event.get(event_id) if PydanticObjectId.is_valid(event_id) else None
+    if not event:
+        raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
+
+    try:
+        hits, next_offset = await search_service.search(event_id, vectors, offset, limit)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Vector store timed out")
+
+    return SearchResponse(
+        event_id=event_id,
+        results=hits,
+        next_cursor=search_service.encode_cursor(event_id, vectors, next_offset) if next_offset is not None else None,
+    )
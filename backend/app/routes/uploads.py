@@ -0,0 +1,104 @@
+from beanie import PydanticObjectId
+from fastapi import APIRouter, HTTPException, Query, Request, Response, Security
+from app.api.deps import RoleChecker
+from app.models.event import Event
+from app.models.upload_session import UploadSession
+from app.models.user import User
+from app.schemas.media import IngestJobResponse, UploadSessionCreate, UploadSessionResponse
+from app.services.resumable_upload_service import resumable_upload_service
+
+router = APIRouter()
+
+allow_photographer = RoleChecker(["photographer", "admin"])
+
+@router.post("/{event_id}/uploads", response_model=UploadSessionResponse, status_code=201)
+async def create_upload_session(
+    event_id: str,
+    body: UploadSessionCreate,
+    current_user: User = Security(allow_photographer)
+):
+    """
+    Start a resumable upload of one image or ZIP.
+
+    Send the file with ``PUT /uploads/{upload_id}?offset=N`` in any number of
+    chunks, check progress with ``GET`` after a dropped connection, then
+    ``POST /uploads/{upload_id}/complete`` to queue it for processing.
+    """
+    event = await Event.get(event_id) if PydanticObjectId.is_valid(event_id) else None
+    if not event:
+        raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
+
+    session = await resumable_upload_service.create(event_id, str(current_user.id), body.file_name, body.total_size)
+    return _session_response(session)
+
+@router.get("/{event_id}/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    event_id: str,
+    upload_id: str,
+    response: Response,
+    current_user: User = Security(allow_photographer)
+):
+    """Get how many bytes of an upload have been received."""
+    session = await resumable_upload_service.get(event_id, upload_id, str(current_user.id))
+    response.headers["Upload-Offset"] = str(session.received)
+    return _session_response(session)
+
+@router.put("/{event_id}/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    event_id: str,
+    upload_id: str,
+    request: Request,
+    response: Response,
+    offset: int = Query(..., ge=0),
+    current_user: User = Security(allow_photographer)
+):
+    """
+    Append the raw request body at ``offset``.
+
+    The offset must equal the bytes received so far; otherwise 409 is
+    returned with the expected value in the ``Upload-Offset`` header.
+    """
+    session = await resumable_upload_service.get(event_id, upload_id, str(current_user.id))
+    session = await resumable_upload_service.write_chunk(session, offset, request.stream())
+    response.headers["Upload-Offset"] = str(session.received)
+    return _session_response(session)
+
+@router.post("/{event_id}/uploads/{upload_id}/complete", response_model=IngestJobResponse, status_code=202)
+async def complete_upload(
+    event_id: str,
+    upload_id: str,
+    current_user: User = Security(allow_photographer)
+):
+    """Queue a fully uploaded file for processing; poll the returned job."""
+    session = await resumable_upload_service.get(event_id, upload_id, str(current_user.id))
+    job = await resumable_upload_service.complete(session)
+    return IngestJobResponse(
+        job_id=str(job.id),
+        event_id=job.event_id,
+        status=job.status,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+@router.delete("/{event_id}/uploads/{upload_id}", status_code=204)
+async def abort_upload(
+    event_id: str,
+    upload_id: str,
+    current_user: User = Security(allow_photographer)
+):
+    """Cancel an upload and discard the received bytes."""
+    session = await resumable_upload_service.get(event_id, upload_id, str(current_user.id))
+    await resumable_upload_service.abort(session)
+
+def _session_response(session: UploadSession) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        upload_id=str(session.id),
+        event_id=session.event_id,
+        file_name=session.file_name,
+        total_size=session.total_size,
+        offset=session.received,
+        status=session.status,
+        job_id=session.job_id,
+        created_at=session.created_at,
+        updated_at=session.updated_at,
+    )
@@ -1,8 +1,10 @@
+from beanie import PydanticObjectId
 from fastapi import APIRouter, HTTPException, Depends
 from app.models.user import User
-from app.schemas.user import UserCreate, UserResponse
-from app.core.security import hash_password
+from app.schemas.user import UserCreate, UserResponse, UserUpdate
+from app.core.security import password_hasher
 from app.api.deps import get_current_active_user
+from app.core.principal_cache import principal_cache
 
 router = APIRouter()
 
@@ -17,7 +19,7 @@ async def create_user(user_in: UserCreate):
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
-    hashed_password = hash_password(user_in.password)
+    hashed_password = await password_hasher.hash(user_in.password)
     user = User(
         email=user_in.email,
         hashed_password=hashed_password,
@@ -45,3 +47,34 @@ async def read_users():
     Get all users. Only for admins.
     """
     return await User.find_all().to_list()
+
+
+@router.patch("/{user_id}", response_model=UserResponse, dependencies=[Depends(allow_admin)])
+async def update_user(user_id: str, user_in: UserUpdate):
+    """
+    Update a user, e.g. change their role or deactivate them. Only for admins.
+    """
+    user = await User.get(user_id) if PydanticObjectId.is_valid(user_id) else None
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    previous_email = user.email
+    # Explicit nulls are ignored; role and is_active must never be cleared
+    changes = user_in.model_dump(exclude_unset=True, exclude_none=True)
+    password = changes.pop("password", None)
+    if password:
+        changes["hashed_password"] = await password_hasher.hash(password)
+    if changes.get("email") and changes["email"] != previous_email:
+        if await User.find_one(User.email == changes["email"]):
+            raise HTTPException(
+                status_code=400,
+                detail="The user with this email already exists in the system.",
+            )
+    for field, value in changes.items():
+        setattr(user, field, value)
+    await user.save()
+
+    # Requests must not keep acting with the old role or active flag
+    principal_cache.invalidate(previous_email)
+    principal_cache.invalidate(user.email)
+    return user
@@ -0,0 +1,18 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+class ProfilingStart(BaseModel):
+    route: str  # regular expression searched in the request path
+    method: Optional[str] = None
+    requests: int = Field(10, ge=1)
+    interval: float = Field(0.005, ge=0.001, le=1.0)  # seconds between samples
+
+class ProfilingStatus(BaseModel):
+    active: bool
+    route: Optional[str] = None
+    method: Optional[str] = None
+    requests: Optional[int] = None
+    completed: Optional[int] = None
+    samples: Optional[int] = None
+    interval: Optional[float] = None
+    profiles: List[str] = []
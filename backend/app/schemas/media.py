@@ -1,4 +1,5 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 class UploadResponse(BaseModel):
@@ -7,5 +8,51 @@ class UploadResponse(BaseModel):
     failed_files: List[str]
     status: str = "UPLOAD_COMPLETED"
 
+class IngestJobResponse(BaseModel):
+    job_id: str
+    event_id: str
+    status: str
+    total_uploaded: int = 0
+    duplicate_count: int = 0
+    failed_files: List[str] = []
+    image_status_counts: Dict[str, int] = {}
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+class UploadSessionCreate(BaseModel):
+    file_name: str
+    total_size: int
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    event_id: str
+    file_name: str
+    total_size: int
+    offset: int
+    status: str
+    job_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+class SearchHit(BaseModel):
+    image_id: str
+    file_name: str
+    score: float
+    matched_faces: int = 1
+    upload_timestamp: datetime
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+class SearchResponse(BaseModel):
+    event_id: str
+    results: List[SearchHit]
+    next_cursor: Optional[str] = None
+
+class DownloadRequest(BaseModel):
+    """Photos to download: explicit image ids, or every match of a search cursor."""
+    image_ids: List[str] = []
+    cursor: Optional[str] = None
+
 class ErrorResponse(BaseModel):
     detail: str
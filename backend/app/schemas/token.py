@@ -1,5 +1,7 @@
 from typing import Optional
+from beanie import PydanticObjectId
 from pydantic import BaseModel
+from app.models.user import UserRole
 
 class Token(BaseModel):
     access_token: str
@@ -7,3 +9,5 @@ class Token(BaseModel):
 
 class TokenPayload(BaseModel):
     sub: Optional[str] = None
+    uid: Optional[PydanticObjectId] = None
+    role: Optional[UserRole] = None
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+from typing import List, Optional
+
+from app.config import settings
+from app.core.executors import run_io
+from app.core.logging import get_logger
+from app.models.image import ImageHashView, ImageMetadata
+from app.services.media_store import media_store
+from app.services.resumable_upload_service import resumable_upload_service
+
+logger = get_logger(__name__)
+
+
+class BlobSweeper:
+    """
+    Deletes stored blobs that no image references.
+
+    Uploads never delete blobs themselves: another upload of the same content
+    may be about to reference a blob whose own metadata insert failed. A blob
+    is only removed once it has gone ``media_orphan_grace`` seconds without
+    being written or reused and no ImageMetadata carries its content hash.
+    Each pass also expires idle resumable upload sessions and deletes their
+    part files.
+    """
+
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+        self.removed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(), name="blob-sweeper")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def sweep(self) -> int:
+        """Delete orphaned blobs; returns how many were removed."""
+        cutoff = time.time() - settings.media_orphan_grace
+        paths = await run_io(media_store.list_blobs, cutoff)
+        removed = 0
+        for start in range(0, len(paths), self.batch_size):
+            batch = paths[start:start + self.batch_size]
+            # Blob file names are the content hash plus the extension
+            hashes = {os.path.splitext(os.path.basename(path))[0]: path for path in batch}
+            referenced = {
+                document.content_hash
+                for document in await ImageMetadata.find(
+                    {"content_hash": {"$in": list(hashes)}},
+                    projection_model=ImageHashView,
+                ).to_list()
+            }
+            orphans = [path for content_hash, path in hashes.items() if content_hash not in referenced]
+            removed += await run_io(self._remove, orphans, cutoff)
+        if removed:
+            logger.info(f"Removed {removed} orphaned blobs")
+        self.removed += removed
+        return removed
+
+    @staticmethod
+    def _remove(paths: List[str], cutoff: float) -> int:
+        removed = 0
+        for path in paths:
+            try:
+                # Skip blobs reused since they were listed
+                if os.stat(path).st_mtime >= cutoff:
+                    continue
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.media_sweep_interval)
+            try:
+                await resumable_upload_service.expire_sessions()
+            except Exception as e:
+                logger.error(f"Upload session sweep failed: {e}")
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Blob sweep failed: {e}")
+
+
+blob_sweeper = BlobSweeper()
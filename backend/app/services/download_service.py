@@ -0,0 +1,114 @@
+import os
+import zipfile
+from datetime import datetime
+from typing import Iterator, List, Set
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.models.image import ImageFileView, ImageMetadata
+
+logger = get_logger(__name__)
+
+
+class _ChunkSink:
+    """Write-only, unseekable stream that hands written bytes back in chunks."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class DownloadService:
+    """Builds ZIP archives of an event's photos on the fly."""
+
+    @staticmethod
+    async def resolve_images(event_id: str, image_ids: List[str]) -> List[ImageFileView]:
+        """
+        Load the event's images for the given ids, keeping their order.
+
+        Ids that are invalid or belong to another event are dropped.
+        """
+        object_ids = []
+        for image_id in image_ids:
+            try:
+                object_ids.append(ObjectId(image_id))
+            except InvalidId:
+                continue
+        if not object_ids:
+            return []
+        images = await ImageMetadata.find(
+            {"_id": {"$in": object_ids}, "event_id.$id": ObjectId(event_id)},
+            projection_model=ImageFileView,
+        ).to_list()
+        by_id = {str(image.id): image for image in images}
+        return [by_id[image_id] for image_id in dict.fromkeys(image_ids) if image_id in by_id]
+
+    @staticmethod
+    def iter_archive(images: List[ImageFileView]) -> Iterator[bytes]:
+        """
+        Stream a ZIP of the images' originals.
+
+        Entries are stored uncompressed (photos do not shrink) and written with
+        data descriptors, so no temp archive is needed and memory stays around
+        one read chunk however many photos are included. Blocking; Starlette
+        runs sync iterators in its thread pool.
+
+        Yields:
+            Consecutive pieces of the archive
+        """
+        sink = _ChunkSink()
+        names: Set[str] = set()
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for image in images:
+                try:
+                    source = open(image.file_path, "rb")
+                except OSError as e:
+                    logger.warning(f"Skipping {image.file_path} in download: {e}")
+                    continue
+                with source:
+                    stat = os.fstat(source.fileno())
+                    info = zipfile.ZipInfo(
+                        DownloadService._unique_name(image.file_name, names),
+                        date_time=datetime.fromtimestamp(stat.st_mtime).timetuple()[:6],
+                    )
+                    info.compress_type = zipfile.ZIP_STORED
+                    info.file_size = stat.st_size
+                    with archive.open(info, "w") as entry:
+                        while chunk := source.read(settings.upload_chunk_size):
+                            entry.write(chunk)
+                            yield sink.drain()
+                yield sink.drain()
+        yield sink.drain()
+
+    @staticmethod
+    def _unique_name(file_name: str, names: Set[str]) -> str:
+        name = os.path.basename(file_name) or "photo"
+        stem, ext = os.path.splitext(name)
+        counter = 1
+        while name in names:
+            counter += 1
+            name = f"{stem} ({counter}){ext}"
+        names.add(name)
+        return name
+
+
+download_service = DownloadService()
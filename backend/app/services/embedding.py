@@ -0,0 +1,154 @@
+"""Face detection and embedding models."""
+import importlib
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+from app.core.imaging import load_image
+
+# (left, top, right, bottom) in pixel coordinates of the analysed image
+Box = Tuple[int, int, int, int]
+
+
+class FaceEmbedder(ABC):
+    """
+    Interface for pluggable CPU face models.
+
+    ``detect`` finds faces in an image and ``embed`` turns a batch of face
+    crops into an ``N x dimension`` float32 matrix. Implementations must be
+    picklable so they can run in worker processes.
+    """
+
+    dimension: int = 128
+
+    @abstractmethod
+    def detect(self, image: Image.Image) -> List[Box]:
+        """Face boxes found in ``image``."""
+
+    @abstractmethod
+    def embed(self, faces: List[Image.Image]) -> np.ndarray:
+        """Embed face crops as an ``len(faces) x dimension`` float32 matrix."""
+
+
+class ReferenceEmbedder(FaceEmbedder):
+    """
+    Deterministic stand-in model for tests and offline development.
+
+    Treats the centred square of the image as the single face and embeds it as
+    a normalised 16x8 grayscale thumbnail, so identical images always map to
+    identical vectors and visually similar images land close together.
+    """
+
+    def __init__(self, dimension: int = 128):
+        if dimension != 128:
+            raise ValueError("ReferenceEmbedder only produces 128-d vectors")
+        self.dimension = dimension
+
+    def detect(self, image: Image.Image) -> List[Box]:
+        width, height = image.size
+        side = min(width, height)
+        if side == 0:
+            return []
+        left = (width - side) // 2
+        top = (height - side) // 2
+        return [(left, top, left + side, top + side)]
+
+    def embed(self, faces: List[Image.Image]) -> np.ndarray:
+        vectors = np.empty((len(faces), self.dimension), dtype=np.float32)
+        for i, face in enumerate(faces):
+            pixels = np.asarray(face.convert("L").resize((16, 8), Image.BILINEAR), dtype=np.float32).ravel()
+            pixels -= pixels.mean()
+            norm = np.linalg.norm(pixels)
+            vectors[i] = pixels / norm if norm else pixels
+        return vectors
+
+
+def load_embedder(spec: Optional[str] = None) -> FaceEmbedder:
+    """
+    Build the embedder named by ``settings.embedding_model``.
+
+    Args:
+        spec: ``"reference"`` or a ``"package.module:ClassName"`` path to a
+            FaceEmbedder subclass
+
+    Returns:
+        Embedder instance
+    """
+    spec = spec or settings.embedding_model
+    if spec == "reference":
+        return ReferenceEmbedder(settings.vector_dimension)
+    module_name, _, class_name = spec.partition(":")
+    embedder_cls = getattr(importlib.import_module(module_name), class_name)
+    return embedder_cls()
+
+
+def embed_image(embedder: FaceEmbedder, image: Image.Image) -> Tuple[List[Box], np.ndarray]:
+    """
+    Detect and embed every face in an image.
+
+    Returns:
+        Tuple of (face boxes, ``len(boxes) x dimension`` embedding matrix)
+    """
+    image = image.convert("RGB")
+    boxes = embedder.detect(image)
+    if not boxes:
+        return [], np.empty((0, embedder.dimension), dtype=np.float32)
+    return boxes, embedder.embed([image.crop(box) for box in boxes])
+
+
+def embed_image_bytes(embedder: FaceEmbedder, data: bytes) -> np.ndarray:
+    """Decode an encoded image (e.g. an uploaded selfie) and embed its faces."""
+    _, vectors = embed_image(embedder, load_image(data, settings.embedding_max_side).image)
+    return vectors
+
+
+# Embedder of the current worker process, set by init_worker
+_worker_embedder: Optional[FaceEmbedder] = None
+
+
+def init_worker(spec: Optional[str] = None) -> None:
+    """Process pool initializer: load the model once per worker process."""
+    global _worker_embedder
+    _worker_embedder = load_embedder(spec)
+
+
+def embed_batch(sources: List[Union[str, bytes]]) -> List[Tuple[Optional[np.ndarray], Optional[str]]]:
+    """
+    Detect faces in a batch of images and embed all crops in one model call.
+
+    Runs in a worker process set up by ``init_worker``.
+
+    Args:
+        sources: Stored image paths or encoded image bytes
+
+    Returns:
+        Per source, either (``N x dimension`` matrix, None) or (None, error)
+    """
+    embedder = _worker_embedder or load_embedder()
+    crops: List[Image.Image] = []
+    counts: List[Optional[int]] = []
+    errors: List[Optional[str]] = []
+    for source in sources:
+        try:
+            image = load_image(source, settings.embedding_max_side).image
+            boxes = embedder.detect(image)
+            crops.extend(image.crop(box) for box in boxes)
+            counts.append(len(boxes))
+            errors.append(None)
+        except Exception as e:
+            counts.append(None)
+            errors.append(str(e) or type(e).__name__)
+
+    vectors = embedder.embed(crops) if crops else np.empty((0, embedder.dimension), dtype=np.float32)
+    results: List[Tuple[Optional[np.ndarray], Optional[str]]] = []
+    offset = 0
+    for count, error in zip(counts, errors):
+        if count is None:
+            results.append((None, error))
+            continue
+        results.append((vectors[offset:offset + count], None))
+        offset += count
+    return results
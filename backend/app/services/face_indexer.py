@@ -0,0 +1,119 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.core.batching import MicroBatcher
+from app.core.executors import get_embedding_executor
+from app.core.logging import get_logger
+from app.models.image import ImageMetadata, ImageStatus
+from app.services.embedding import embed_batch
+from app.services.search_service import face_vector_id
+from app.services.vector_store import vector_store
+
+logger = get_logger(__name__)
+
+
+def image_event_id(image: ImageMetadata) -> str:
+    """Id of the event an image belongs to, whether or not the link is fetched."""
+    link = image.event_id
+    ref = getattr(link, "ref", None)
+    return str(ref.id if ref is not None else link.id)
+
+
+class FaceIndexer:
+    """
+    Ingest stage that embeds every face in an image and indexes it.
+
+    Images handed to ``process`` by the ingest workers are grouped into
+    micro-batches (``embedding_batch_size`` images or ``embedding_batch_wait``
+    seconds, whichever comes first). Each batch is detected and embedded in one
+    call on the embedding process pool, and its faces are written with one
+    upsert per event.
+    """
+
+    def __init__(self):
+        self.batcher: MicroBatcher[ImageMetadata, None] = MicroBatcher(
+            self._index_batch,
+            max_size=settings.embedding_batch_size,
+            max_wait=settings.embedding_batch_wait,
+            concurrency=settings.embedding_workers,
+            name="face-indexer",
+        )
+        self.images_processed = 0
+        self.images_failed = 0
+        self.faces_indexed = 0
+        self.embed_seconds = 0.0
+        self.started_at = time.monotonic()
+
+    async def start(self) -> None:
+        self.started_at = time.monotonic()
+
+    async def stop(self) -> None:
+        await self.batcher.stop()
+
+    async def process(self, image: ImageMetadata) -> None:
+        """
+        ImageProcessor hook: wait until the image's faces are indexed.
+
+        Raises:
+            RuntimeError: if the image could not be read or embedded
+        """
+        await self.batcher.submit(image)
+
+    async def stats(self) -> Dict[str, Any]:
+        """Throughput and queue depth of the embedding stage."""
+        uploaded = await ImageMetadata.find(ImageMetadata.status == ImageStatus.UPLOADED.value).count()
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "images_waiting": uploaded,
+            "images_pending_batch": self.batcher.pending,
+            "batches_in_flight": self.batcher.in_flight,
+            "images_processed": self.images_processed,
+            "images_failed": self.images_failed,
+            "faces_indexed": self.faces_indexed,
+            "batches": self.batcher.batches,
+            "faces_per_second": self.faces_indexed / elapsed if elapsed else 0.0,
+            "embed_faces_per_second": self.faces_indexed / self.embed_seconds if self.embed_seconds else 0.0,
+        }
+
+    async def _index_batch(self, images: List[ImageMetadata]) -> List[Optional[Exception]]:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        results = await loop.run_in_executor(
+            get_embedding_executor(),
+            embed_batch,
+            [image.file_path for image in images],
+        )
+        self.embed_seconds += time.perf_counter() - started
+
+        outcomes: List[Optional[Exception]] = []
+        by_event: Dict[str, List[tuple]] = defaultdict(list)
+        for image, (vectors, error) in zip(images, results):
+            if error is not None:
+                outcomes.append(RuntimeError(f"Could not embed {image.file_name}: {error}"))
+                continue
+            outcomes.append(None)
+            event_id = image_event_id(image)
+            image_id = str(image.id)
+            for face_index, vector in enumerate(vectors):
+                by_event[event_id].append((
+                    face_vector_id(image_id, face_index),
+                    vector.tolist(),
+                    {"event_id": event_id, "image_id": image_id, "face_index": face_index},
+                ))
+
+        for event_id, vectors in by_event.items():
+            await vector_store.upsert_vectors_async(vectors, event_id=event_id)
+
+        face_count = sum(len(vectors) for vectors in by_event.values())
+        failed = sum(outcome is not None for outcome in outcomes)
+        self.faces_indexed += face_count
+        self.images_processed += len(images) - failed
+        self.images_failed += failed
+        logger.debug(f"Indexed {face_count} faces from {len(images)} images in {time.perf_counter() - started:.2f}s")
+        return outcomes
+
+
+face_indexer = FaceIndexer()
@@ -0,0 +1,344 @@
+import asyncio
+import io
+from abc import ABC, abstractmethod
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set
+from beanie import PydanticObjectId
+from beanie.odm.operators.update.general import Set
+from beanie.odm.queries.update import UpdateResponse
+from fastapi import HTTPException, UploadFile
+from app.config import settings
+from app.models.image import ImageMetadata, ImageStatus
+from app.models.job import IngestJob, JobStatus
+from app.services.media_store import media_store
+from app.services.upload_service import StoredFile, upload_service
+from app.core import tracing
+from app.core.executors import run_io
+from app.core.logging import get_logger
+from app.core.metrics import registry
+
+logger = get_logger(__name__)
+
+INGEST_JOB_SECONDS = registry.histogram("ingest_job_duration_seconds", "Time to store an upload job's files", ["status"])
+INGEST_IMAGE_SECONDS = registry.histogram("ingest_image_duration_seconds", "Time to process one image", ["status"])
+
+# A processing stage run on each claimed image, e.g. embedding or thumbnails
+ImageProcessor = Callable[[ImageMetadata], Awaitable[None]]
+
+
+class ImageQueue(ABC):
+    """Queue of uploaded images waiting to move from UPLOADED to PROCESSING."""
+
+    @abstractmethod
+    async def put(self, image_ids: List[PydanticObjectId]) -> None:
+        """Enqueue images; ids already waiting in the queue are skipped."""
+
+    @abstractmethod
+    async def claim(self) -> Optional[ImageMetadata]:
+        """Wait for the next image and atomically mark it PROCESSING."""
+
+    @staticmethod
+    async def _claim_document(query: dict) -> Optional[ImageMetadata]:
+        return await ImageMetadata.find_one(query).update(
+            Set({
+                ImageMetadata.status: ImageStatus.PROCESSING.value,
+                ImageMetadata.processing_started_at: datetime.utcnow(),
+            }),
+            response_type=UpdateResponse.NEW_DOCUMENT,
+        )
+
+
+class MemoryImageQueue(ImageQueue):
+    """In-process queue; images are only picked up by the worker that uploaded them."""
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        # Ids waiting in _queue, so recovery does not stack duplicates
+        self._queued: Set[PydanticObjectId] = set()
+
+    async def put(self, image_ids: List[PydanticObjectId]) -> None:
+        for image_id in image_ids:
+            if image_id in self._queued:
+                continue
+            self._queued.add(image_id)
+            self._queue.put_nowait(image_id)
+
+    async def claim(self) -> Optional[ImageMetadata]:
+        image_id = await self._queue.get()
+        self._queued.discard(image_id)
+        return await self._claim_document({"_id": image_id, "status": ImageStatus.UPLOADED.value})
+
+
+class MongoImageQueue(ImageQueue):
+    """
+    Uses ImageMetadata.status as a shared queue.
+
+    Any worker in any process can claim UPLOADED images, so processing can be
+    scaled independently of the processes that accept uploads.
+    """
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+
+    async def put(self, image_ids: List[PydanticObjectId]) -> None:
+        # Documents are already UPLOADED; pollers will find them
+        return None
+
+    async def claim(self) -> Optional[ImageMetadata]:
+        while True:
+            image = await self._claim_document({"status": ImageStatus.UPLOADED.value})
+            if image is not None:
+                return image
+            await asyncio.sleep(self.poll_interval)
+
+
+QUEUE_BACKENDS: Dict[str, Callable[[], ImageQueue]] = {
+    "memory": MemoryImageQueue,
+    "mongo": lambda: MongoImageQueue(settings.ingest_poll_interval),
+}
+
+
+class IngestService:
+    """
+    Runs uploads as background jobs and drives images through
+    UPLOADED -> PROCESSING -> INDEXED.
+    """
+
+    def __init__(self):
+        self.processors: List[ImageProcessor] = []
+        self.queue: Optional[ImageQueue] = None
+        self._upload_slots: Optional[asyncio.Semaphore] = None
+        self._tasks: set = set()
+        self._workers: List[asyncio.Task] = []
+        self._recovery: Optional[asyncio.Task] = None
+
+    def register_processor(self, processor: ImageProcessor) -> None:
+        """Add a stage run for every image before it is marked INDEXED."""
+        self.processors.append(processor)
+
+    async def start(self) -> None:
+        """Create the queue, start processing workers and recover abandoned work."""
+        backend = settings.ingest_queue_backend.lower()
+        if backend not in QUEUE_BACKENDS:
+            raise ValueError(f"Unknown ingest queue backend: {settings.ingest_queue_backend}")
+        self.queue = QUEUE_BACKENDS[backend]()
+        self._upload_slots = asyncio.Semaphore(settings.ingest_upload_workers)
+        self._workers = [
+            asyncio.create_task(self._process_loop(), name=f"ingest-worker-{i}")
+            for i in range(settings.ingest_processing_workers)
+        ]
+        self._recovery = asyncio.create_task(self._recover_loop(), name="ingest-recovery")
+        logger.info(f"Ingest service started with {len(self._workers)} workers ({backend} queue)")
+
+    async def stop(self) -> None:
+        """Cancel workers and in-flight upload jobs."""
+        tasks = [*self._workers, *self._tasks, *([self._recovery] if self._recovery else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._recovery = None
+        self._tasks.clear()
+
+    async def submit(
+        self,
+        event_id: str,
+        files: List[UploadFile],
+        photographer_id: str,
+        cleanup_paths: Optional[List[str]] = None,
+        stored: Sequence[StoredFile] = (),
+    ) -> IngestJob:
+        """
+        Create an ingest job and process the files in the background.
+
+        The uploads' spooled files are detached from the request so they stay
+        readable after the response has been sent.
+
+        Args:
+            event_id: Event the files belong to
+            files: Uploaded images or ZIPs
+            photographer_id: Uploading user
+            cleanup_paths: Files to delete once the job has finished with them
+            stored: Images already moved into the media store
+
+        Returns:
+            The queued job
+        """
+        if self.queue is None:
+            raise RuntimeError("Ingest service not started")
+
+        job = IngestJob(
+            event_id=event_id,
+            photographer_id=photographer_id,
+            file_names=[*(stored_file.file_name for stored_file in stored), *(file.filename for file in files)],
+        )
+        await job.insert()
+
+        detached = [self._detach(file) for file in files]
+        task = asyncio.create_task(self._run_job(job, detached, cleanup_paths or [], list(stored)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def get_status_counts(self, job_id: str) -> Dict[str, int]:
+        """Count a job's images per ImageMetadata status."""
+        pipeline = [
+            {"$match": {"job_id": job_id}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ]
+        results = await ImageMetadata.find_all().aggregate(pipeline).to_list()
+        return {result["_id"]: result["count"] for result in results}
+
+    @staticmethod
+    def _detach(file: UploadFile) -> UploadFile:
+        # Starlette closes request files once the response is sent; hand it a
+        # dummy to close and keep the real spooled file for the job.
+        detached = UploadFile(file.file, size=file.size, filename=file.filename, headers=file.headers)
+        file.file = io.BytesIO()
+        return detached
+
+    async def _run_job(self, job: IngestJob, files: List[UploadFile], cleanup_paths: List[str], stored: List[StoredFile]) -> None:
+        tracing.bind(job_id=str(job.id))
+        started = time.perf_counter()
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        with tracing.trace() as stages:
+            try:
+                async with self._upload_slots:
+                    await self._update_job(job, status=JobStatus.RUNNING)
+                    total_uploaded, duplicate_count, failed_files = await upload_service.handle_uploads(
+                        event_id=job.event_id,
+                        files=files,
+                        photographer_id=job.photographer_id,
+                        job_id=str(job.id),
+                        stored=stored,
+                    )
+
+                image_ids = [
+                    image.id
+                    for image in await ImageMetadata.find(
+                        ImageMetadata.job_id == str(job.id),
+                        ImageMetadata.status == ImageStatus.UPLOADED.value,
+                    ).to_list()
+                ]
+                await self.queue.put(image_ids)
+                await self._update_job(
+                    job,
+                    status=JobStatus.COMPLETED if total_uploaded or duplicate_count or not failed_files else JobStatus.FAILED,
+                    total_uploaded=total_uploaded,
+                    duplicate_count=duplicate_count,
+                    failed_files=failed_files,
+                )
+            except HTTPException as e:
+                await self._update_job(job, status=JobStatus.FAILED, error=e.detail)
+            except asyncio.CancelledError:
+                await self._update_job(job, status=JobStatus.FAILED, error="Cancelled")
+                raise
+            except Exception as e:
+                logger.error(f"Ingest job {job.id} failed: {e}")
+                await self._update_job(job, status=JobStatus.FAILED, error=str(e))
+            finally:
+                heartbeat.cancel()
+                duration = time.perf_counter() - started
+                INGEST_JOB_SECONDS.observe(duration, status=JobStatus(job.status).value)
+                logger.info(
+                    "ingest_job_finished",
+                    status=JobStatus(job.status).value,
+                    duration=round(duration, 4),
+                    stages=tracing.summarize(stages),
+                )
+                for file in files:
+                    await file.close()
+                for path in cleanup_paths:
+                    await run_io(media_store.remove, path)
+
+    async def recover(self, requeue_all: bool = False) -> None:
+        """
+        Pick up work abandoned by a process that stopped mid-way.
+
+        PROCESSING images claimed more than ``ingest_stale_after`` seconds ago
+        go back to UPLOADED, and QUEUED or RUNNING jobs that have not
+        heartbeated for that long are marked FAILED (their spooled files died
+        with the process). With the memory queue, UPLOADED images are
+        re-enqueued unless already waiting in it; claims are atomic, so an
+        image queued by two processes is still processed once.
+
+        Args:
+            requeue_all: Re-enqueue every UPLOADED image, as on startup
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=settings.ingest_stale_after)
+        reset = await ImageMetadata.find({
+            "status": ImageStatus.PROCESSING.value,
+            "$or": [{"processing_started_at": {"$lt": cutoff}}, {"processing_started_at": None}],
+        }).update_many(Set({ImageMetadata.status: ImageStatus.UPLOADED.value}))
+        failed = await IngestJob.find({
+            "status": {"$in": [JobStatus.QUEUED.value, JobStatus.RUNNING.value]},
+            "updated_at": {"$lt": cutoff},
+        }).update_many(Set({"status": JobStatus.FAILED.value, "error": "Interrupted by a restart", "updated_at": now}))
+
+        query = {"status": ImageStatus.UPLOADED.value}
+        if not requeue_all:
+            query["upload_timestamp"] = {"$lt": cutoff}
+        image_ids = [image.id for image in await ImageMetadata.find(query).to_list()]
+        await self.queue.put(image_ids)
+
+        reset_count = reset.modified_count if reset else 0
+        failed_count = failed.modified_count if failed else 0
+        if reset_count or failed_count:
+            logger.warning(f"Recovered {reset_count} abandoned images and failed {failed_count} orphaned jobs")
+
+    async def _recover_loop(self) -> None:
+        requeue_all = True
+        while True:
+            try:
+                await self.recover(requeue_all)
+                requeue_all = False
+            except Exception as e:
+                logger.error(f"Ingest recovery failed: {e}")
+            await asyncio.sleep(settings.ingest_stale_after / 3)
+
+    async def _heartbeat(self, job: IngestJob) -> None:
+        """Keep a running job's updated_at fresh so recovery does not fail it."""
+        while True:
+            await asyncio.sleep(settings.ingest_stale_after / 3)
+            try:
+                await self._update_job(job)
+            except Exception as e:
+                logger.warning(f"Heartbeat for ingest job {job.id} failed: {e}")
+
+    async def _process_loop(self) -> None:
+        backoff = 0.5
+        while True:
+            try:
+                image = await self.queue.claim()
+                if image is None:
+                    continue
+                await self._process_image(image)
+                backoff = 0.5
+            except Exception as e:
+                # A transient Mongo error must not kill the worker; a claimed
+                # image left PROCESSING is picked up again by recovery
+                logger.error(f"Ingest worker error, retrying in {backoff:.1f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    async def _process_image(self, image: ImageMetadata) -> None:
+        started = time.perf_counter()
+        try:
+            for processor in self.processors:
+                await processor(image)
+            image.status = ImageStatus.INDEXED.value
+        except Exception as e:
+            logger.error(f"Processing image {image.id} failed: {e}")
+            image.status = ImageStatus.FAILED.value
+        INGEST_IMAGE_SECONDS.observe(time.perf_counter() - started, status=image.status)
+        await image.set({ImageMetadata.status: image.status})
+
+    @staticmethod
+    async def _update_job(job: IngestJob, **fields) -> None:
+        fields["updated_at"] = datetime.utcnow()
+        await job.set(fields)
+
+
+ingest_service = IngestService()
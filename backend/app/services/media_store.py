@@ -0,0 +1,192 @@
+import hashlib
+import os
+import uuid
+from typing import BinaryIO, List, NamedTuple
+from fastapi import UploadFile
+from app.config import settings
+from app.core.executors import run_io
+from app.core.file_types import SNIFF_SIZE, InvalidUpload, check_head
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class StoredBlob(NamedTuple):
+    content_hash: str
+    path: str
+    size: int
+    created: bool  # False if an identical blob was already stored
+
+
+class MediaStore:
+    """
+    Content-addressed blob storage for uploaded media.
+
+    Blobs live at ``{upload_dir}/blobs/ab/cd/<sha256><ext>``. Content is hashed
+    while it is written to a temporary file, which is then either moved into
+    place or discarded if the blob already exists, so identical files are
+    stored once. Reusing a blob refreshes its mtime, which the orphan sweeper
+    treats as a recent reference.
+    """
+
+    def __init__(self, base_dir: str):
+        self.blob_dir = os.path.join(base_dir, "blobs")
+        self.tmp_dir = os.path.join(self.blob_dir, "tmp")
+        self.derived_dir = os.path.join(base_dir, "derived")
+        self.chunk_size = settings.upload_chunk_size
+
+    def blob_path(self, content_hash: str, ext: str) -> str:
+        return os.path.join(self.blob_dir, content_hash[:2], content_hash[2:4], f"{content_hash}{ext}")
+
+    def derived_path(self, key: str, variant: str, ext: str) -> str:
+        """Path of a rendition (e.g. a thumbnail) of the blob with hash ``key``."""
+        return os.path.join(self.derived_dir, key[:2], key[2:4], f"{key}_{variant}{ext}")
+
+    async def save_upload(self, file: UploadFile, ext: str) -> StoredBlob:
+        """
+        Stream an upload into the store without blocking the event loop.
+
+        Reads happen on the loop; writes and hashing run on the I/O executor.
+        The read stops at the first chunk that breaks the size limit or whose
+        leading bytes do not match ``ext``.
+
+        Args:
+            file: Incoming upload to read from
+            ext: File extension to store the blob under
+
+        Returns:
+            The stored blob
+
+        Raises:
+            InvalidUpload: if the content is too large or not of type ``ext``
+        """
+        temp_path = await run_io(self._temp_path)
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            buffer = await run_io(open, temp_path, "wb")
+            try:
+                while chunk := await file.read(self.chunk_size):
+                    self._check_chunk(ext, size, chunk)
+                    await run_io(self._write_chunk, buffer, hasher, chunk)
+                    size += len(chunk)
+            finally:
+                await run_io(buffer.close)
+            return await run_io(self._commit, temp_path, hasher.hexdigest(), ext, size)
+        except BaseException:
+            await run_io(self._discard, temp_path)
+            raise
+
+    def save_stream(self, source: BinaryIO, ext: str) -> StoredBlob:
+        """
+        Copy a readable stream into the store. Blocking; run on the I/O executor.
+
+        Args:
+            source: Stream to read from, e.g. an open ZIP member
+            ext: File extension to store the blob under
+
+        Returns:
+            The stored blob
+
+        Raises:
+            InvalidUpload: if the content is too large or not of type ``ext``
+        """
+        temp_path = self._temp_path()
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp_path, "wb") as target:
+                while chunk := source.read(self.chunk_size):
+                    self._check_chunk(ext, size, chunk)
+                    self._write_chunk(target, hasher, chunk)
+                    size += len(chunk)
+            return self._commit(temp_path, hasher.hexdigest(), ext, size)
+        except BaseException:
+            self._discard(temp_path)
+            raise
+
+    def adopt(self, path: str, content_hash: str, ext: str) -> StoredBlob:
+        """
+        Move a fully written file into the store without copying it.
+        Blocking; run on the I/O executor.
+
+        Args:
+            path: File on the same filesystem as the store; it is moved or,
+                if the blob already exists, deleted
+            content_hash: SHA-256 of the file, see ``hash_file``
+            ext: File extension to store the blob under
+
+        Returns:
+            The stored blob
+        """
+        return self._commit(path, content_hash, ext, os.path.getsize(path))
+
+    def hash_file(self, path: str) -> str:
+        """SHA-256 of a file's content. Blocking; run on the I/O executor."""
+        hasher = hashlib.sha256()
+        with open(path, "rb") as source:
+            while chunk := source.read(self.chunk_size):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def remove(self, path: str) -> None:
+        """Delete a blob. Blocking; run on the I/O executor."""
+        self._discard(path)
+
+    def list_blobs(self, older_than: float) -> List[str]:
+        """
+        Paths of blobs, and abandoned temporary files, last written or reused
+        before ``older_than`` (a Unix time). Blocking; run on the I/O executor.
+        """
+        paths = []
+        for root, _, files in os.walk(self.blob_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.stat(path).st_mtime < older_than:
+                        paths.append(path)
+                except FileNotFoundError:
+                    continue
+        return paths
+
+    def _temp_path(self) -> str:
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        return os.path.join(self.tmp_dir, uuid.uuid4().hex)
+
+    def _commit(self, temp_path: str, content_hash: str, ext: str, size: int) -> StoredBlob:
+        final_path = self.blob_path(content_hash, ext)
+        if os.path.exists(final_path):
+            try:
+                os.utime(final_path)
+            except FileNotFoundError:
+                pass  # swept in the meantime; store this copy instead
+            else:
+                os.remove(temp_path)
+                return StoredBlob(content_hash, final_path, size, created=False)
+
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+        return StoredBlob(content_hash, final_path, size, created=True)
+
+    @staticmethod
+    def _check_chunk(ext: str, size: int, chunk: bytes) -> None:
+        if size == 0:
+            check_head(ext, chunk[:SNIFF_SIZE])
+        if size + len(chunk) > settings.max_file_size:
+            raise InvalidUpload("File too large")
+
+    @staticmethod
+    def _write_chunk(buffer: BinaryIO, hasher, chunk: bytes) -> None:
+        # hashlib releases the GIL for large buffers, so this overlaps with other work
+        hasher.update(chunk)
+        buffer.write(chunk)
+
+    @staticmethod
+    def _discard(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+media_store = MediaStore(settings.upload_dir)
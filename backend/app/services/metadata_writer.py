@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import List, Optional, Tuple
+from beanie import PydanticObjectId
+from pymongo.errors import BulkWriteError
+from app.config import settings
+from app.models.image import ImageMetadata
+from app.core import tracing
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class MetadataBatchWriter:
+    """
+    Buffers ImageMetadata documents and writes them with unordered insert_many.
+
+    A flush happens when the buffer reaches ``batch_size`` documents or when the
+    oldest buffered document has waited ``flush_interval`` seconds. Documents
+    rejected by MongoDB are reported through ``failed_files`` using the label
+    supplied to ``add``; duplicate-key rejections (content already stored for
+    the event) are counted in ``duplicate_count`` instead.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        self.batch_size = batch_size or settings.metadata_batch_size
+        self.flush_interval = flush_interval if flush_interval is not None else settings.metadata_flush_interval
+        self.inserted_count = 0
+        self.duplicate_count = 0
+        self.failed_files: List[str] = []
+        self.failed_documents: List[ImageMetadata] = []
+        self._buffer: List[Tuple[ImageMetadata, str]] = []
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._first_buffered_at = 0.0
+
+    async def __aenter__(self) -> "MetadataBatchWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def add(self, document: ImageMetadata, label: str) -> None:
+        """
+        Queue a document for insertion.
+
+        Args:
+            document: Metadata document to insert
+            label: Name reported in failed_files if the insert fails
+        """
+        if document.id is None:
+            # Assign ids up front so callers can reference documents before the flush
+            document.id = PydanticObjectId()
+        if not self._buffer:
+            self._first_buffered_at = time.monotonic()
+            if self.flush_interval > 0:
+                self._timer = asyncio.create_task(self._flush_later())
+        self._buffer.append((document, label))
+
+        if len(self._buffer) >= self.batch_size or (
+            time.monotonic() - self._first_buffered_at >= self.flush_interval
+        ):
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write all buffered documents in a single unordered insert_many."""
+        async with self._lock:
+            if self._timer is not None and self._timer is not asyncio.current_task():
+                self._timer.cancel()
+            self._timer = None
+
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+
+            documents = [document for document, _ in batch]
+            failed_indexes = set()
+            duplicate_indexes = set()
+            try:
+                with tracing.span("upload.metadata_insert", documents=len(documents)):
+                    await ImageMetadata.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    if error.get("code") == DUPLICATE_KEY_ERROR:
+                        duplicate_indexes.add(error["index"])
+                    else:
+                        failed_indexes.add(error["index"])
+                if failed_indexes:
+                    logger.error(f"Bulk metadata insert had {len(failed_indexes)} failures: {e}")
+            except Exception as e:
+                failed_indexes = set(range(len(batch)))
+                logger.error(f"Bulk metadata insert failed: {e}")
+
+            for index, (document, label) in enumerate(batch):
+                if index in duplicate_indexes:
+                    self.duplicate_count += 1
+                elif index in failed_indexes:
+                    self.failed_files.append(label)
+                    self.failed_documents.append(document)
+                else:
+                    self.inserted_count += 1
+
+    async def close(self) -> None:
+        """Flush any remaining documents and stop the flush timer."""
+        await self.flush()
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
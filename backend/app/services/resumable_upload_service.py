@@ -0,0 +1,352 @@
+import hashlib
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, BinaryIO, Dict, Optional, Tuple
+from beanie import PydanticObjectId
+from beanie.odm.operators.update.general import Set
+from beanie.odm.queries.update import UpdateResponse
+from fastapi import HTTPException, UploadFile
+from app.config import settings
+from app.core.executors import run_io
+from app.core.file_types import SNIFF_SIZE, InvalidUpload, check_head
+from app.core.logging import get_logger
+from app.models.job import IngestJob, JobStatus
+from app.models.upload_session import UploadSession, UploadSessionStatus
+from app.services.ingest_service import ingest_service
+from app.services.media_store import media_store
+from app.services.upload_service import ALLOWED_EXTENSIONS, StoredFile
+
+logger = get_logger(__name__)
+
+
+class ResumableUploadService:
+    """
+    Chunked uploads that survive dropped connections.
+
+    A session reserves a part file that chunks are written into at their
+    offsets. The server records how many bytes have landed, so after a
+    disconnect the client asks for the offset and continues from there.
+    Finishing a session hands the file to the regular ingest job; a finished
+    image is moved into the media store as is rather than copied.
+
+    Images are hashed as their chunks arrive. The running hash lives in the
+    process that received the chunks, so a session continued on another
+    worker is hashed from its part file on completion instead.
+    """
+
+    def __init__(self, base_dir: str):
+        self.session_dir = os.path.join(base_dir, "sessions")
+        # Session id -> (bytes hashed, running SHA-256) for image sessions
+        self._hashers: Dict[str, Tuple[int, Any]] = {}
+
+    async def create(self, event_id: str, photographer_id: str, file_name: str, total_size: int) -> UploadSession:
+        """
+        Open a session for one image or ZIP.
+
+        Raises:
+            HTTPException: 413 if the file is too large, 422 for an
+                unsupported type or empty file
+        """
+        ext = os.path.splitext(file_name)[1].lower()
+        if ext != ".zip" and ext not in ALLOWED_EXTENSIONS:
+            raise HTTPException(status_code=422, detail=f"{file_name} (Unsupported type)")
+        if total_size <= 0:
+            raise HTTPException(status_code=422, detail="total_size must be positive")
+        max_size = settings.resumable_max_size if ext == ".zip" else settings.max_file_size
+        if total_size > max_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload too large. Maximum size is {max_size // (1024*1024)}MB",
+            )
+
+        session_id = PydanticObjectId()
+        part_path = os.path.join(self.session_dir, f"{session_id}.part")
+        await run_io(self._create_part, part_path)
+        session = UploadSession(
+            id=session_id,
+            event_id=event_id,
+            photographer_id=photographer_id,
+            file_name=file_name,
+            total_size=total_size,
+            part_path=part_path,
+        )
+        await session.insert()
+        return session
+
+    async def get(self, event_id: str, upload_id: str, photographer_id: str) -> UploadSession:
+        """Load a session owned by the photographer, or raise 404."""
+        session = await UploadSession.get(upload_id) if PydanticObjectId.is_valid(upload_id) else None
+        if not session or session.event_id != event_id or session.photographer_id != photographer_id:
+            raise HTTPException(status_code=404, detail=f"Upload {upload_id} not found")
+        return session
+
+    async def write_chunk(self, session: UploadSession, offset: int, chunks: AsyncIterator[bytes]) -> UploadSession:
+        """
+        Write a chunk at ``offset``, which must equal the bytes received so far.
+
+        Bytes that arrive before a disconnect are kept, so a retry only resends
+        what is missing. The writer first claims the session, so of two
+        concurrent requests at the same offset only one writes; the claim is
+        renewed while bytes keep arriving and can only be taken over once it
+        lapses, and a writer that lost its claim stops before writing again.
+
+        Raises:
+            HTTPException: 409 if the session is closed or the offset does not
+                match, 413 if the chunk runs past total_size or the chunk limit,
+                415 if the file does not start like its extension says
+        """
+        self._ensure_open(session)
+        if offset != session.received:
+            raise self._offset_conflict(session)
+        token = uuid.uuid4().hex
+        if await self._claim_writer(session, offset, token) is None:
+            raise self._offset_conflict(await UploadSession.get(session.id), "Another request is writing this upload")
+        renewed_at = time.monotonic()
+        hasher = self._take_hasher(session, offset)
+
+        written = 0
+        try:
+            part = await run_io(open, session.part_path, "r+b")
+        except BaseException:
+            await self._advance(session, offset, offset, token)
+            raise
+        try:
+            await run_io(part.seek, offset)
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                if written + len(chunk) > settings.resumable_max_chunk_size:
+                    raise HTTPException(status_code=413, detail="Chunk too large")
+                if offset + written + len(chunk) > session.total_size:
+                    raise HTTPException(status_code=413, detail="Chunk runs past the declared total_size")
+                if offset == 0 and written == 0 and len(chunk) >= SNIFF_SIZE:
+                    self._check_head(session, chunk[:SNIFF_SIZE])
+                if time.monotonic() - renewed_at > settings.resumable_write_lease / 3:
+                    if await self._claim_writer(session, offset, token) is None:
+                        raise HTTPException(status_code=409, detail="Upload claim expired")
+                    renewed_at = time.monotonic()
+                await run_io(self._write, part, hasher, chunk)
+                written += len(chunk)
+        finally:
+            await run_io(part.close)
+            # Commits the bytes and releases the claim; fails only if the claim lapsed
+            updated = await self._advance(session, offset, offset + written, token)
+            if updated is None:
+                raise self._offset_conflict(await UploadSession.get(session.id), "Upload claim expired")
+            if hasher is not None:
+                self._hashers[str(session.id)] = (offset + written, hasher)
+            session = updated
+        return session
+
+    async def complete(self, session: UploadSession) -> IngestJob:
+        """
+        Hand a fully received file to the ingest pipeline.
+
+        Raises:
+            HTTPException: 409 if bytes are missing or the session is closed
+        """
+        self._ensure_open(session)
+        if session.received != session.total_size:
+            raise self._offset_conflict(session, f"Upload incomplete: {session.received} of {session.total_size} bytes received")
+        self._check_head(session, await run_io(self._read_head, session.part_path))
+        claimed = await self._transition(session, UploadSessionStatus.COMPLETED)
+        if claimed is None:
+            raise HTTPException(status_code=409, detail="Upload already finished")
+
+        ext = os.path.splitext(session.file_name)[1].lower()
+        if ext == ".zip":
+            source = await run_io(open, session.part_path, "rb")
+            job = await ingest_service.submit(
+                event_id=session.event_id,
+                files=[UploadFile(source, size=session.total_size, filename=session.file_name)],
+                photographer_id=session.photographer_id,
+                cleanup_paths=[session.part_path],
+            )
+        else:
+            hashed, hasher = self._hashers.pop(str(session.id), (0, None))
+            if hasher is not None and hashed == session.total_size:
+                content_hash = hasher.hexdigest()
+            else:
+                content_hash = await run_io(media_store.hash_file, session.part_path)
+            blob = await run_io(media_store.adopt, session.part_path, content_hash, ext)
+            job = await ingest_service.submit(
+                event_id=session.event_id,
+                files=[],
+                photographer_id=session.photographer_id,
+                stored=[StoredFile(session.file_name, blob)],
+            )
+        await claimed.set({UploadSession.job_id: str(job.id)})
+        return job
+
+    async def abort(self, session: UploadSession) -> None:
+        """Cancel an open session and delete its data."""
+        if await self._transition(session, UploadSessionStatus.ABORTED) is None:
+            raise HTTPException(status_code=409, detail="Upload already finished")
+        self._hashers.pop(str(session.id), None)
+        await run_io(media_store.remove, session.part_path)
+
+    async def expire_sessions(self) -> int:
+        """
+        Expire sessions idle for ``resumable_session_ttl`` and delete part
+        files nothing will read again.
+
+        A part file outlives its session when the session was aborted or
+        expired by a process that died before deleting it, or when the
+        ingest job of a completed ZIP died before cleaning up.
+
+        Returns:
+            Number of part files deleted
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=settings.resumable_session_ttl)
+        removed = 0
+        for session in await UploadSession.find({
+            "status": UploadSessionStatus.OPEN.value,
+            "updated_at": {"$lt": cutoff},
+        }).to_list():
+            expired = await UploadSession.find_one({
+                "_id": session.id,
+                "status": UploadSessionStatus.OPEN.value,
+                "updated_at": {"$lt": cutoff},
+                "$or": [{"writer": None}, {"writer_expires": {"$lt": now}}],
+            }).update(
+                Set({UploadSession.status: UploadSessionStatus.EXPIRED, UploadSession.updated_at: now}),
+                response_type=UpdateResponse.NEW_DOCUMENT,
+            )
+            if expired is not None:
+                self._hashers.pop(str(session.id), None)
+                await run_io(media_store.remove, session.part_path)
+                removed += 1
+
+        parts = await run_io(self._stale_parts, time.time() - settings.resumable_session_ttl)
+        if parts:
+            sessions = {
+                str(session.id): session
+                for session in await UploadSession.find(
+                    {"_id": {"$in": [PydanticObjectId(session_id) for session_id in parts if PydanticObjectId.is_valid(session_id)]}}
+                ).to_list()
+            }
+            active_jobs = {
+                str(job.id)
+                for job in await IngestJob.find({
+                    "_id": {"$in": [PydanticObjectId(s.job_id) for s in sessions.values() if s.job_id]},
+                    "status": {"$in": [JobStatus.QUEUED.value, JobStatus.RUNNING.value]},
+                }).to_list()
+            }
+            for session_id, path in parts.items():
+                session = sessions.get(session_id)
+                if session is not None and (
+                    session.status == UploadSessionStatus.OPEN
+                    or (session.status == UploadSessionStatus.COMPLETED and session.job_id in active_jobs)
+                ):
+                    continue
+                await run_io(media_store.remove, path)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} abandoned upload session files")
+        return removed
+
+    @staticmethod
+    def _ensure_open(session: UploadSession) -> None:
+        if session.status != UploadSessionStatus.OPEN:
+            raise HTTPException(status_code=409, detail=f"Upload is {session.status.value.lower()}")
+
+    def _take_hasher(self, session: UploadSession, offset: int) -> Optional[Any]:
+        """The running hash of an image session if it covers exactly ``offset`` bytes."""
+        if os.path.splitext(session.file_name)[1].lower() == ".zip":
+            return None
+        if offset == 0:
+            return hashlib.sha256()
+        hashed, hasher = self._hashers.pop(str(session.id), (0, None))
+        # Held by another worker's process, or out of step after a failed write
+        return hasher if hashed == offset else None
+
+    def _stale_parts(self, older_than: float) -> Dict[str, str]:
+        """Session id -> part file, for part files untouched since ``older_than``."""
+        parts = {}
+        if not os.path.isdir(self.session_dir):
+            return parts
+        for entry in os.scandir(self.session_dir):
+            try:
+                if entry.name.endswith(".part") and entry.stat().st_mtime < older_than:
+                    parts[entry.name[:-len(".part")]] = entry.path
+            except FileNotFoundError:
+                continue
+        return parts
+
+    @staticmethod
+    def _write(part: BinaryIO, hasher: Optional[Any], chunk: bytes) -> None:
+        part.write(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+
+    @staticmethod
+    def _check_head(session: UploadSession, head: bytes) -> None:
+        try:
+            check_head(os.path.splitext(session.file_name)[1].lower(), head)
+        except InvalidUpload as e:
+            raise HTTPException(status_code=415, detail=str(e))
+
+    @staticmethod
+    def _read_head(path: str) -> bytes:
+        with open(path, "rb") as part:
+            return part.read(SNIFF_SIZE)
+
+    @staticmethod
+    def _offset_conflict(session: Optional[UploadSession], detail: Optional[str] = None) -> HTTPException:
+        received = session.received if session else 0
+        return HTTPException(
+            status_code=409,
+            detail=detail or f"Expected offset {received}",
+            headers={"Upload-Offset": str(received)},
+        )
+
+    @staticmethod
+    async def _claim_writer(session: UploadSession, offset: int, token: str) -> Optional[UploadSession]:
+        """Take or renew the right to write at ``offset``; None if another writer holds it."""
+        now = datetime.utcnow()
+        return await UploadSession.find_one({
+            "_id": session.id,
+            "received": offset,
+            "status": UploadSessionStatus.OPEN.value,
+            "$or": [{"writer": None}, {"writer": token}, {"writer_expires": {"$lt": now}}],
+        }).update(
+            Set({
+                UploadSession.writer: token,
+                UploadSession.writer_expires: now + timedelta(seconds=settings.resumable_write_lease),
+            }),
+            response_type=UpdateResponse.NEW_DOCUMENT,
+        )
+
+    @staticmethod
+    async def _advance(session: UploadSession, start: int, end: int, token: str) -> Optional[UploadSession]:
+        return await UploadSession.find_one(
+            {"_id": session.id, "received": start, "writer": token, "status": UploadSessionStatus.OPEN.value}
+        ).update(
+            Set({
+                UploadSession.received: end,
+                UploadSession.writer: None,
+                UploadSession.writer_expires: None,
+                UploadSession.updated_at: datetime.utcnow(),
+            }),
+            response_type=UpdateResponse.NEW_DOCUMENT,
+        )
+
+    @staticmethod
+    async def _transition(session: UploadSession, status: UploadSessionStatus) -> Optional[UploadSession]:
+        return await UploadSession.find_one(
+            {"_id": session.id, "status": UploadSessionStatus.OPEN.value}
+        ).update(
+            Set({UploadSession.status: status, UploadSession.updated_at: datetime.utcnow()}),
+            response_type=UpdateResponse.NEW_DOCUMENT,
+        )
+
+    @staticmethod
+    def _create_part(path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "wb").close()
+
+
+resumable_upload_service = ResumableUploadService(settings.upload_dir)
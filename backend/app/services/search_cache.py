@@ -0,0 +1,162 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+GLOBAL_SCOPE = "*"
+
+
+def filter_event_id(filter: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Return the event a Pinecone-style filter is pinned to, if any."""
+    if not filter:
+        return None
+    condition = filter.get("event_id")
+    if isinstance(condition, dict):
+        condition = condition.get("$eq")
+    return condition if isinstance(condition, str) else None
+
+
+class _Entry(NamedTuple):
+    scope: str
+    result: Any
+    size: int
+    expires_at: float
+
+
+class QueryCache:
+    """
+    LRU + TTL cache for vector query results.
+
+    Keys combine a quantized copy of the query embedding with the filter and
+    top_k, so near-identical selfies share an entry. Entries are scoped to the
+    event named in the filter and are dropped whenever that event's vectors
+    change; unscoped entries are dropped on any write. A per-scope generation
+    counter stops a query that raced with a write from caching a stale result.
+    Generations are per process: writes made by other processes only show up
+    once entries expire.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float, quantization: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.quantization = quantization
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._generations: Dict[str, int] = {}
+        self._write_count = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, vector: Any, top_k: int, filter: Optional[Dict[str, Any]], include_metadata: bool, event_id: Optional[str] = None) -> Tuple[Hashable, str]:
+        """
+        Build a cache key and its invalidation scope.
+
+        The scope is the event partition queried, or the event pinned by the
+        filter for unpartitioned queries.
+
+        Returns:
+            Tuple of (key, scope)
+        """
+        quantized = np.round(np.asarray(vector, dtype=np.float32) / self.quantization).astype(np.int32)
+        digest = hashlib.blake2b(quantized.tobytes(), digest_size=16).digest()
+        filter_key = json.dumps(filter, sort_keys=True, default=str) if filter else ""
+        scope = event_id or filter_event_id(filter) or GLOBAL_SCOPE
+        return (digest, filter_key, top_k, include_metadata, event_id), scope
+
+    def generation(self, scope: str) -> Tuple[int, int]:
+        """Snapshot the write generation for a scope; pass it back to ``put``."""
+        with self._lock:
+            return self._snapshot(scope)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.result
+
+    def put(self, key: Hashable, scope: str, result: Any, generation: Tuple[int, int]) -> None:
+        size = self._estimate_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self._snapshot(scope):
+                # A write touched this scope while the query was running
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(scope, result, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, event_id: Optional[str] = None) -> None:
+        """
+        Drop cached results affected by a write.
+
+        Args:
+            event_id: Event whose vectors changed; None means unknown, which
+                drops every entry.
+        """
+        with self._lock:
+            self.invalidations += 1
+            self._write_count += 1
+            if event_id is None:
+                self._generations[GLOBAL_SCOPE] = self._generations.get(GLOBAL_SCOPE, 0) + 1
+                self._entries.clear()
+                self._bytes = 0
+                return
+            self._generations[event_id] = self._generations.get(event_id, 0) + 1
+            for key in [k for k, entry in self._entries.items() if entry.scope in (event_id, GLOBAL_SCOPE)]:
+                self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _snapshot(self, scope: str) -> Tuple[int, int]:
+        if scope == GLOBAL_SCOPE:
+            # Unscoped results depend on every event's vectors
+            return self._write_count, self._write_count
+        return self._generations.get(scope, 0), self._generations.get(GLOBAL_SCOPE, 0)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    @staticmethod
+    def _estimate_size(result: Any) -> int:
+        try:
+            return 256 + sum(128 + len(str(match.get("metadata") or "")) for match in result["matches"])
+        except Exception:
+            return 1024
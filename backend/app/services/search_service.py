@@ -0,0 +1,170 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.config import settings
+from app.core import tracing
+from app.core.logging import get_logger
+from app.models.image import ImageMetadata, ImageSearchView
+from app.schemas.media import SearchHit
+from app.services.selfie_encoder import selfie_encoder
+from app.services.vector_store import vector_store
+
+logger = get_logger(__name__)
+
+
+def face_vector_id(image_id: str, face_index: int) -> str:
+    """Vector id for the ``face_index``-th face of an image."""
+    return f"{image_id}:{face_index}"
+
+
+def image_id_from_vector_id(vector_id: str) -> str:
+    return vector_id.split(":", 1)[0]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class SearchService:
+    """Embeds selfies, queries an event's vectors and hydrates the hits."""
+
+    @staticmethod
+    async def embed_selfie(data: bytes) -> np.ndarray:
+        """
+        Embed every face in a selfie via the batching selfie encoder.
+
+        Returns:
+            ``N x dimension`` matrix, one row per detected face
+        """
+        with tracing.span("search.embed_selfie"):
+            return await selfie_encoder.encode(data)
+
+    async def search(self, event_id: str, vectors: np.ndarray, offset: int, limit: int) -> Tuple[List[SearchHit], Optional[int]]:
+        """
+        Find an event's photos matching one or more face embeddings.
+
+        All faces are queried in one batch. The merged ranking is fetched
+        once per query (and cached by the vector store), then paged; each
+        page is hydrated with a single ``$in`` query.
+
+        Args:
+            event_id: Event to search
+            vectors: N x dimension matrix of query embeddings
+            offset: Index of the first ranked photo to return
+            limit: Page size
+
+        Returns:
+            Tuple of (hits, offset of the next page or None)
+        """
+        ranked = await self.rank(event_id, vectors)
+        page = ranked[offset:offset + limit]
+        next_offset = offset + limit if offset + limit < len(ranked) else None
+        return await self.hydrate(page), next_offset
+
+    async def rank(self, event_id: str, vectors: np.ndarray) -> List[Tuple[str, float, int]]:
+        """Query every face and return the event's full photo ranking (see rank_images)."""
+        responses = await vector_store.query_vectors_batch_async(
+            vectors,
+            top_k=settings.search_max_results,
+            include_metadata=False,
+            event_id=event_id,
+        )
+        return self.rank_images([response["matches"] for response in responses])
+
+    @staticmethod
+    def rank_images(match_lists: List[List[Any]]) -> List[Tuple[str, float, int]]:
+        """
+        Merge per-face match lists into a photo ranking.
+
+        Matches scoring above ``search_max_distance`` are dropped, so a photo
+        only counts a query face it plausibly contains and an unknown face
+        returns no results rather than its nearest strangers.
+
+        Returns:
+            (image_id, best score, number of query faces found in the photo),
+            photos with more matched faces first, then by best score
+        """
+        best: Dict[str, float] = {}
+        faces: Dict[str, int] = {}
+        for matches in match_lists:
+            seen = set()
+            for match in matches:
+                score = float(match["score"])
+                if settings.search_max_distance and score > settings.search_max_distance:
+                    continue
+                image_id = image_id_from_vector_id(match["id"])
+                if image_id not in best or score < best[image_id]:
+                    best[image_id] = score
+                if image_id not in seen:
+                    seen.add(image_id)
+                    faces[image_id] = faces.get(image_id, 0) + 1
+        ranked = [(image_id, score, faces[image_id]) for image_id, score in best.items()]
+        ranked.sort(key=lambda item: (-item[2], item[1]))
+        return ranked
+
+    @staticmethod
+    async def hydrate(page: List[Tuple[str, float, int]]) -> List[SearchHit]:
+        """Load the photos for a page of ranked ids in one projected query."""
+        object_ids = []
+        for image_id, _, _ in page:
+            try:
+                object_ids.append(ObjectId(image_id))
+            except InvalidId:
+                logger.warning(f"Skipping search hit with invalid image id {image_id}")
+        if not object_ids:
+            return []
+
+        documents = await ImageMetadata.find(
+            {"_id": {"$in": object_ids}},
+            projection_model=ImageSearchView,
+        ).to_list()
+        by_id = {str(document.id): document for document in documents}
+
+        hits = []
+        for image_id, score, matched_faces in page:
+            document = by_id.get(image_id)
+            if document is None:
+                continue
+            hits.append(SearchHit(
+                image_id=image_id,
+                file_name=document.file_name,
+                score=score,
+                matched_faces=matched_faces,
+                upload_timestamp=document.upload_timestamp,
+                width=document.width,
+                height=document.height,
+            ))
+        return hits
+
+    @staticmethod
+    def encode_cursor(event_id: str, vectors: np.ndarray, offset: int) -> str:
+        """Pack the query embeddings and position so later pages need no selfie."""
+        payload = {
+            "e": event_id,
+            "o": offset,
+            "v": base64.b64encode(vectors.astype(np.float16).tobytes()).decode(),
+        }
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(event_id: str, cursor: str) -> Tuple[np.ndarray, int]:
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            vectors = np.frombuffer(base64.b64decode(payload["v"]), dtype=np.float16).astype(np.float32)
+            vectors = vectors.reshape(-1, settings.vector_dimension)
+            offset = int(payload["o"])
+            cursor_event = payload["e"]
+        except (ValueError, KeyError, TypeError, binascii.Error) as e:
+            raise InvalidCursor("Invalid cursor") from e
+        if cursor_event != event_id or offset < 0 or not 0 < len(vectors) <= settings.search_max_faces:
+            raise InvalidCursor("Cursor does not belong to this event")
+        return vectors, offset
+
+
+search_service = SearchService()
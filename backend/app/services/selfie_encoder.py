@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, Dict, List, Union
+
+import numpy as np
+
+from app.config import settings
+from app.core.batching import MicroBatcher
+from app.core.executors import get_selfie_executor
+from app.core.logging import get_logger
+from app.services.embedding import embed_batch
+
+logger = get_logger(__name__)
+
+
+class SelfieEncoder:
+    """
+    Turns selfies into query embeddings under burst load.
+
+    Concurrent ``encode`` calls are coalesced for up to ``selfie_batch_wait``
+    seconds or ``selfie_batch_size`` selfies and embedded as one batch in a
+    worker process, so the model runs at batch efficiency when many guests
+    search at once and a lone request waits only a few milliseconds.
+    """
+
+    def __init__(self):
+        self.batcher: MicroBatcher[bytes, np.ndarray] = MicroBatcher(
+            self._encode_batch,
+            max_size=settings.selfie_batch_size,
+            max_wait=settings.selfie_batch_wait,
+            concurrency=settings.selfie_embedding_workers,
+            name="selfie-encoder",
+        )
+
+    async def encode(self, data: bytes) -> np.ndarray:
+        """
+        Embed every face in an encoded selfie.
+
+        Returns:
+            ``N x dimension`` matrix, one row per detected face
+
+        Raises:
+            ValueError: if the image cannot be decoded
+        """
+        return await self.batcher.submit(data)
+
+    async def stop(self) -> None:
+        await self.batcher.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.batcher.batches
+        return {
+            "pending": self.batcher.pending,
+            "batches_in_flight": self.batcher.in_flight,
+            "batches": batches,
+            "selfies": self.batcher.items,
+            "mean_batch_size": self.batcher.items / batches if batches else 0.0,
+        }
+
+    @staticmethod
+    async def _encode_batch(selfies: List[bytes]) -> List[Union[np.ndarray, Exception]]:
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(get_selfie_executor(), embed_batch, selfies)
+        return [vectors if error is None else ValueError(error) for vectors, error in results]
+
+
+selfie_encoder = SelfieEncoder()
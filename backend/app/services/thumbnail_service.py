@@ -0,0 +1,50 @@
+import asyncio
+
+from app.config import settings
+from app.core.executors import get_media_executor
+from app.core.imaging import render_resized
+from app.core.logging import get_logger
+from app.models.image import ImageMetadata
+from app.services.media_store import media_store
+
+logger = get_logger(__name__)
+
+EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg"}
+
+
+class ThumbnailService:
+    """Ingest stage that renders a grid thumbnail and a preview for each image."""
+
+    async def process(self, image: ImageMetadata) -> None:
+        """
+        ImageProcessor hook: render both sizes in the media process pool and
+        store their paths on the document.
+        """
+        format = settings.thumbnail_format.upper()
+        if format not in EXTENSIONS:
+            raise ValueError(f"Unsupported thumbnail format: {settings.thumbnail_format}")
+        ext = EXTENSIONS[format]
+        key = image.content_hash or str(image.id)
+        outputs = [
+            (media_store.derived_path(key, f"thumb{settings.thumbnail_size}", ext), settings.thumbnail_size),
+            (media_store.derived_path(key, f"preview{settings.preview_size}", ext), settings.preview_size),
+        ]
+
+        loop = asyncio.get_running_loop()
+        thumbnail_path, preview_path = await loop.run_in_executor(
+            get_media_executor(),
+            render_resized,
+            image.file_path,
+            outputs,
+            format,
+            settings.thumbnail_quality,
+        )
+        image.thumbnail_path = thumbnail_path
+        image.preview_path = preview_path
+        await image.set({
+            ImageMetadata.thumbnail_path: thumbnail_path,
+            ImageMetadata.preview_path: preview_path,
+        })
+
+
+thumbnail_service = ThumbnailService()
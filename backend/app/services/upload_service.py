@@ -1,136 +1,208 @@
+import asyncio
 import os
-import shutil
 import zipfile
-import uuid
-import tempfile
-from datetime import datetime
-from typing import List, Tuple
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+from beanie import PydanticObjectId
 from fastapi import UploadFile, HTTPException
 from app.config import settings
 from app.models.event import Event
 from app.models.user import User
 from app.models.image import ImageMetadata
 from app.core.logging import get_logger
+from app.core.executors import run_io
+from app.core import tracing
+from app.core.file_types import SNIFF_SIZE, InvalidUpload, check_head
+from app.core.imaging import image_size
+from app.core.metrics import BYTE_BUCKETS, registry
+from app.services.media_store import StoredBlob, media_store
+from app.services.metadata_writer import MetadataBatchWriter
 
 logger = get_logger(__name__)
 
+UPLOAD_FILES = registry.counter("upload_files_total", "Uploaded images by outcome", ["outcome"])
+UPLOAD_BYTES = registry.counter("upload_bytes_total", "Bytes of images stored")
+UPLOAD_FILE_BYTES = registry.histogram("upload_file_bytes", "Size of stored images", buckets=BYTE_BUCKETS)
+
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png"}
 
+
+class StoredFile(NamedTuple):
+    """An image already moved into the media store, e.g. a finished resumable upload."""
+    file_name: str
+    blob: StoredBlob
+
+
 class UploadService:
     def __init__(self):
         self.base_upload_dir = settings.upload_dir
 
-    async def handle_uploads(self, event_id: str, files: List[UploadFile], photographer_id: str) -> Tuple[int, List[str]]:
-        """Handles multiple files (images or ZIPs)."""
-        total_uploaded = 0
+    async def handle_uploads(self, event_id: str, files: List[UploadFile], photographer_id: str, job_id: Optional[str] = None, stored: Sequence[StoredFile] = ()) -> Tuple[int, int, List[str]]:
+        """
+        Handles multiple files (images or ZIPs), tagging their metadata with ``job_id`` if given.
+
+        ``stored`` images are already in the media store and only get metadata.
+
+        Returns:
+            Tuple of (uploaded count, duplicate count, failed files). Images
+            whose content already exists in the event count as duplicates and
+            get no new metadata row.
+        """
         failed_files = []
 
         # Ensure event and user exist
-        event = await Event.get(event_id)
+        with tracing.span("upload.lookup"):
+            event = await Event.get(event_id) if PydanticObjectId.is_valid(event_id) else None
+            user = await User.get(photographer_id) if event and PydanticObjectId.is_valid(photographer_id) else None
         if not event:
             raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
-            
-        user = await User.get(photographer_id)
         if not user:
             raise HTTPException(status_code=404, detail=f"User {photographer_id} not found")
 
-        # Create event raw directory
-        event_raw_dir = os.path.join(self.base_upload_dir, "events", event_id, "raw")
-        os.makedirs(event_raw_dir, exist_ok=True)
-
-        for file in files:
-            file_ext = os.path.splitext(file.filename)[1].lower()
-            
-            if file_ext == ".zip":
-                uploaded, failed = await self._process_zip(file, event, event_raw_dir, user)
-                total_uploaded += uploaded
-                failed_files.extend(failed)
-            elif file_ext in ALLOWED_EXTENSIONS:
+        async with MetadataBatchWriter() as writer:
+            for stored_file in stored:
+                self._record_blob(stored_file.blob)
+                metadata = await self._metadata(stored_file.file_name, stored_file.blob, event, user, job_id)
+                await writer.add(metadata, stored_file.file_name)
+                UPLOAD_FILES.inc(outcome="stored")
+
+            for file in files:
+                file_ext = os.path.splitext(file.filename)[1].lower()
+
+                if file_ext == ".zip":
+                    _, failed = await self._process_zip(file, event, user, writer, job_id)
+                    failed_files.extend(failed)
+                elif file_ext in ALLOWED_EXTENSIONS:
+                    try:
+                        await self._save_image(file, event, user, writer, job_id)
+                        UPLOAD_FILES.inc(outcome="stored")
+                    except InvalidUpload as e:
+                        UPLOAD_FILES.inc(outcome="rejected")
+                        logger.warning(f"Rejected image {file.filename}: {e}")
+                        failed_files.append(f"{file.filename} ({e})")
+                    except Exception as e:
+                        UPLOAD_FILES.inc(outcome="failed")
+                        logger.error(f"Failed to save image {file.filename}: {e}")
+                        failed_files.append(file.filename)
+                else:
+                    UPLOAD_FILES.inc(outcome="rejected")
+                    failed_files.append(f"{file.filename} (Unsupported type)")
+
+        # Blobs left without metadata are removed later by the orphan sweeper;
+        # deleting them here could race with another upload of the same content
+        failed_files.extend(writer.failed_files)
+        return writer.inserted_count, writer.duplicate_count, failed_files
+
+    async def _save_image(self, file: UploadFile, event: Event, photographer: User, writer: MetadataBatchWriter, job_id: Optional[str] = None) -> None:
+        """Stores a single image and queues its DB entry."""
+        with tracing.span("upload.store", file=file.filename):
+            blob = await media_store.save_upload(file, os.path.splitext(file.filename)[1].lower())
+        self._record_blob(blob)
+        await writer.add(await self._metadata(file.filename, blob, event, photographer, job_id), file.filename)
+
+    async def _process_zip(self, zip_file: UploadFile, event: Event, photographer: User, writer: MetadataBatchWriter, job_id: Optional[str] = None) -> Tuple[int, List[str]]:
+        """
+        Extracts images straight from the uploaded ZIP and queues their DB entries.
+
+        The archive is read in place from the upload's spooled file and members
+        are decompressed concurrently on the I/O executor; zlib releases the GIL,
+        so extraction spreads across cores.
+        """
+        uploaded_count = 0
+        failed_files = []
+
+        try:
+            with tracing.span("upload.zip_open", file=zip_file.filename):
+                await run_io(zip_file.file.seek, 0)
+                check_head(".zip", await run_io(zip_file.file.read, SNIFF_SIZE))
+                await run_io(zip_file.file.seek, 0)
+                zip_ref = await run_io(zipfile.ZipFile, zip_file.file, 'r')
+        except InvalidUpload as e:
+            logger.warning(f"Rejected ZIP {zip_file.filename}: {e}")
+            return 0, [f"{zip_file.filename} ({e})"]
+        except zipfile.BadZipFile:
+            logger.error(f"Corrupted ZIP file: {zip_file.filename}")
+            return 0, [f"{zip_file.filename} (Corrupted ZIP)"]
+        except Exception as e:
+            logger.error(f"Unexpected error processing ZIP {zip_file.filename}: {e}")
+            return 0, [f"{zip_file.filename} (Extraction error)"]
+
+        # Scan for images
+        members = []
+        for member in zip_ref.infolist():
+            if member.is_dir():
+                continue
+
+            filename = os.path.basename(member.filename)
+            if filename and os.path.splitext(filename)[1].lower() in ALLOWED_EXTENSIONS:
+                if member.file_size > settings.max_file_size:
+                    # Declared size is checked up front; the actual bytes are limited while extracting
+                    failed_files.append(f"{member.filename} (File too large)")
+                    continue
+                members.append(member)
+
+        semaphore = asyncio.Semaphore(settings.zip_extract_concurrency)
+
+        async def extract(member: zipfile.ZipInfo) -> None:
+            nonlocal uploaded_count
+            filename = os.path.basename(member.filename)
+            async with semaphore:
                 try:
-                    await self._save_image(file, event, event_raw_dir, user)
-                    total_uploaded += 1
+                    # Extract and store
+                    with tracing.span("upload.zip_extract", file=member.filename):
+                        blob = await run_io(self._extract_member, zip_ref, member, os.path.splitext(filename)[1].lower())
+                    self._record_blob(blob)
+                    await writer.add(await self._metadata(filename, blob, event, photographer, job_id), member.filename)
+                    uploaded_count += 1
+                    UPLOAD_FILES.inc(outcome="stored")
+                except InvalidUpload as e:
+                    UPLOAD_FILES.inc(outcome="rejected")
+                    logger.warning(f"Rejected {member.filename} from ZIP: {e}")
+                    failed_files.append(f"{member.filename} ({e})")
                 except Exception as e:
-                    logger.error(f"Failed to save image {file.filename}: {e}")
-                    failed_files.append(file.filename)
-            else:
-                failed_files.append(f"{file.filename} (Unsupported type)")
-
-        return total_uploaded, failed_files
+                    UPLOAD_FILES.inc(outcome="failed")
+                    logger.error(f"Error processing {member.filename} from ZIP: {e}")
+                    failed_files.append(member.filename)
 
-    async def _save_image(self, file: UploadFile, event: Event, target_dir: str, photographer: User) -> None:
-        """Saves a single image and creates DB entry."""
-        # Generate unique filename to avoid collisions
-        unique_name = f"{uuid.uuid4()}{os.path.splitext(file.filename)[1].lower()}"
-        file_path = os.path.join(target_dir, unique_name)
+        with zip_ref:
+            await asyncio.gather(*(extract(member) for member in members))
 
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        return uploaded_count, failed_files
 
-        # Create DB entry
-        metadata = ImageMetadata(
+    @classmethod
+    async def _metadata(cls, file_name: str, blob: StoredBlob, event: Event, photographer: User, job_id: Optional[str]) -> ImageMetadata:
+        """Builds the DB entry for a stored image, with its dimensions read from the header."""
+        width, height = await run_io(cls._dimensions, blob.path)
+        return ImageMetadata(
             event_id=event,
-            file_name=file.filename,
-            file_path=file_path,
+            file_name=file_name,
+            file_path=blob.path,
+            content_hash=blob.content_hash,
+            file_size=blob.size,
+            width=width,
+            height=height,
             photographer_id=photographer,
-            status="UPLOADED"
+            status="UPLOADED",
+            job_id=job_id
         )
-        await metadata.insert()
-
-    async def _process_zip(self, zip_file: UploadFile, event: Event, target_dir: str, photographer: User) -> Tuple[int, List[str]]:
-        """Extracts ZIP and processes images within."""
-        uploaded_count = 0
-        failed_files = []
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_zip_path = os.path.join(temp_dir, "upload.zip")
-            
-            # Save ZIP temporarily
-            with open(temp_zip_path, "wb") as buffer:
-                shutil.copyfileobj(zip_file.file, buffer)
-
-            try:
-                with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-                    # Scan for images
-                    for member in zip_ref.infolist():
-                        if member.is_dir():
-                            continue
-                        
-                        filename = os.path.basename(member.filename)
-                        if not filename:
-                            continue
-                            
-                        file_ext = os.path.splitext(filename)[1].lower()
-                        if file_ext in ALLOWED_EXTENSIONS:
-                            try:
-                                # Generate unique path in the event folder
-                                unique_name = f"{uuid.uuid4()}{file_ext}"
-                                dest_path = os.path.join(target_dir, unique_name)
-                                
-                                # Extract and save
-                                with zip_ref.open(member) as source, open(dest_path, "wb") as target:
-                                    shutil.copyfileobj(source, target)
-                                
-                                # DB entry
-                                metadata = ImageMetadata(
-                                    event_id=event,
-                                    file_name=filename,
-                                    file_path=dest_path,
-                                    photographer_id=photographer,
-                                    status="UPLOADED"
-                                )
-                                await metadata.insert()
-                                uploaded_count += 1
-                            except Exception as e:
-                                logger.error(f"Error processing {member.filename} from ZIP: {e}")
-                                failed_files.append(member.filename)
-            except zipfile.BadZipFile:
-                logger.error(f"Corrupted ZIP file: {zip_file.filename}")
-                failed_files.append(f"{zip_file.filename} (Corrupted ZIP)")
-            except Exception as e:
-                logger.error(f"Unexpected error processing ZIP {zip_file.filename}: {e}")
-                failed_files.append(f"{zip_file.filename} (Extraction error)")
-
-        return uploaded_count, failed_files
+    @staticmethod
+    def _dimensions(path: str) -> Tuple[Optional[int], Optional[int]]:
+        """Image (width, height) without decoding pixels; (None, None) if the header is unreadable."""
+        try:
+            return image_size(path)
+        except Exception as e:
+            logger.warning(f"Could not read dimensions of {path}: {e}")
+            return None, None
+
+    @staticmethod
+    def _record_blob(blob: StoredBlob) -> None:
+        UPLOAD_BYTES.inc(blob.size)
+        UPLOAD_FILE_BYTES.observe(blob.size)
+
+    @staticmethod
+    def _extract_member(zip_ref: zipfile.ZipFile, member: zipfile.ZipInfo, ext: str) -> StoredBlob:
+        """Copies a single ZIP member into the media store. Runs on the I/O executor."""
+        with zip_ref.open(member) as source:
+            return media_store.save_stream(source, ext)
 
 upload_service = UploadService()
@@ -0,0 +1,572 @@
+"""Vector index backends used by VectorStoreService."""
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from app.config import settings
+from app.core.database import db, init_pinecone
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class VectorBackend(ABC):
+    """
+    Interface implemented by every vector index backend.
+
+    Vectors are partitioned into namespaces (one per event); ``None`` is the
+    default namespace. ``vectorized`` backends answer ``query_batch`` in a
+    single pass; others are fanned out query by query.
+    """
+
+    vectorized = False
+
+    @abstractmethod
+    def upsert(self, vectors: Sequence[Any], namespace: Optional[str] = None) -> int:
+        """Insert or replace vectors given as (id, values, metadata) tuples or dicts."""
+
+    @abstractmethod
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+        namespace: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Return ``{"matches": [{"id", "score", "metadata"}]}`` ordered best first."""
+
+    def query_batch(
+        self,
+        vectors: np.ndarray,
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+        namespace: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Run one query per row of ``vectors``; backends may vectorize this."""
+        return [
+            self.query(vector.tolist(), top_k, filter=filter, include_metadata=include_metadata, namespace=namespace)
+            for vector in np.asarray(vectors, dtype=np.float32)
+        ]
+
+    @abstractmethod
+    def delete(self, ids: List[str], namespace: Optional[str] = None) -> None:
+        """Remove vectors by id; unknown ids are ignored."""
+
+    @abstractmethod
+    def delete_namespace(self, namespace: str) -> None:
+        """Drop every vector in a namespace."""
+
+    def close(self) -> None:
+        pass
+
+
+class PineconeBackend(VectorBackend):
+    """Remote Pinecone index, connected at startup or on first use."""
+
+    vectorized = False  # batch queries are fanned out as parallel single queries
+
+    @staticmethod
+    def get_index():
+        if not db.pinecone_index:
+            # Startup may have skipped or timed out connecting; retry lazily
+            init_pinecone()
+        if not db.pinecone_index:
+            logger.error("Pinecone index not initialized")
+            raise RuntimeError("Pinecone index not initialized")
+        return db.pinecone_index
+
+    def upsert(self, vectors: Sequence[Any], namespace: Optional[str] = None) -> int:
+        response = self.get_index().upsert(vectors=vectors, namespace=namespace or "")
+        return response.get("upserted_count", 0)
+
+    def query(self, vector, top_k, filter=None, include_metadata=True, namespace=None):
+        return self.get_index().query(
+            vector=vector,
+            top_k=top_k,
+            filter=filter,
+            include_metadata=include_metadata,
+            namespace=namespace or "",
+        )
+
+    def delete(self, ids: List[str], namespace: Optional[str] = None) -> None:
+        self.get_index().delete(ids=ids, namespace=namespace or "")
+
+    def delete_namespace(self, namespace: str) -> None:
+        self.get_index().delete(delete_all=True, namespace=namespace)
+
+
+def normalize_vector(item: Any) -> tuple:
+    if isinstance(item, dict):
+        return item["id"], item["values"], item.get("metadata") or {}
+    if len(item) == 2:
+        return item[0], item[1], {}
+    return item[0], item[1], item[2] or {}
+
+
+def _matches_filter(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """Evaluate a Pinecone-style metadata filter ($eq, $ne, $in, $nin, $and, $or)."""
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(_matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class LocalVectorIndex:
+    """
+    In-process euclidean index backed by NumPy; one shard of LocalVectorBackend.
+
+    Small indexes are searched exhaustively. Once the index holds
+    ``ivf_threshold`` vectors, queries go through an IVF coarse quantizer
+    (k-means centroids) and only the ``nprobe`` closest lists are scanned.
+    Scores follow Pinecone's euclidean metric: squared distance, lower is better.
+
+    Centroids are trained on a background thread from a snapshot of the
+    vectors and swapped in when ready; until then queries keep using the
+    previous centroids, or scan exhaustively. With ``persist_path`` set, the
+    index is saved ``persist_delay`` seconds after a write, so a crash loses
+    at most that window.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        ivf_threshold: int = 20000,
+        nprobe: int = 8,
+        persist_path: Optional[str] = None,
+        persist_delay: float = 5.0,
+    ):
+        self.dimension = dimension
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.persist_path = persist_path
+        self.persist_delay = persist_delay
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        self._closed = False
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._metadata: List[Dict[str, Any]] = []
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+        self._centroids: Optional[np.ndarray] = None
+        self._assign = np.empty(0, dtype=np.int32)
+        self._trained_size = 0
+        self._training: Optional[threading.Thread] = None
+        # Rows written while a training run is in flight; reassigned when it lands
+        self._changed_rows: set = set()
+        if persist_path and os.path.exists(persist_path):
+            self._load(persist_path)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, vectors: Sequence[Any]) -> int:
+        items = [normalize_vector(item) for item in vectors]
+        if not items:
+            return 0
+        values = np.asarray([item[1] for item in items], dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}")
+
+        with self._lock:
+            new_ids = [item[0] for item in items if item[0] not in self._rows]
+            self._reserve(len(self._ids) + len(new_ids))
+            for (vector_id, _, metadata), vector in zip(items, values):
+                row = self._rows.get(vector_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._rows[vector_id] = row
+                    self._ids.append(vector_id)
+                    self._metadata.append(dict(metadata))
+                else:
+                    self._metadata[row] = dict(metadata)
+                self._vectors[row] = vector
+                self._sq_norms[row] = float(vector @ vector)
+                if self._centroids is not None:
+                    self._assign[row] = self._nearest_centroids(vector, 1)[0]
+                if self._training is not None:
+                    self._changed_rows.add(row)
+            self._maybe_train()
+        self._schedule_save()
+        return len(items)
+
+    def query(self, vector, top_k, filter=None, include_metadata=True):
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape != (self.dimension,):
+            raise ValueError(f"Expected a query vector of dimension {self.dimension}")
+        return self.query_batch(query[None, :], top_k, filter=filter, include_metadata=include_metadata)[0]
+
+    def query_batch(self, vectors, top_k, filter=None, include_metadata=True) -> List[Dict[str, Any]]:
+        """Answer several queries with one distance-matrix computation."""
+        queries = np.asarray(vectors, dtype=np.float32)
+        if queries.ndim != 2 or queries.shape[1] != self.dimension:
+            raise ValueError(f"Expected an N x {self.dimension} query matrix")
+        empty = [{"matches": [], "namespace": ""} for _ in range(queries.shape[0])]
+
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or top_k <= 0 or queries.shape[0] == 0:
+                return empty
+
+            if self._centroids is not None and count >= self.ivf_threshold:
+                # Scan the union of every query's closest lists
+                probes = np.unique(np.concatenate([
+                    self._nearest_centroids(query, self.nprobe) for query in queries
+                ]))
+                candidates = np.nonzero(np.isin(self._assign[:count], probes))[0]
+            else:
+                # Every row; scanned through views rather than gathered copies
+                candidates = None
+
+            if filter:
+                candidates = np.asarray(
+                    [
+                        row for row in (range(count) if candidates is None else candidates)
+                        if _matches_filter(self._metadata[row], filter)
+                    ],
+                    dtype=np.int64,
+                )
+            if candidates is None:
+                sq_norms, vectors = self._sq_norms[:count], self._vectors[:count]
+            elif candidates.size == 0:
+                return empty
+            else:
+                sq_norms, vectors = self._sq_norms[candidates], self._vectors[candidates]
+
+            distances = (
+                sq_norms[None, :]
+                - 2.0 * (queries @ vectors.T)
+                + np.sum(queries ** 2, axis=1)[:, None]
+            )
+            np.maximum(distances, 0.0, out=distances)
+            k = min(top_k, distances.shape[1])
+            best = np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+            responses = []
+            for row_distances, row_best in zip(distances, best):
+                row_best = row_best[np.argsort(row_distances[row_best])]
+                matches = []
+                for position in row_best:
+                    row = int(position if candidates is None else candidates[position])
+                    match = {"id": self._ids[row], "score": float(row_distances[position])}
+                    if include_metadata:
+                        match["metadata"] = dict(self._metadata[row])
+                    matches.append(match)
+                responses.append({"matches": matches, "namespace": ""})
+        return responses
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            for vector_id in ids:
+                row = self._rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:
+                    # Swap the last row into the hole to keep storage dense
+                    moved_id = self._ids[last]
+                    self._ids[row] = moved_id
+                    self._metadata[row] = self._metadata[last]
+                    self._vectors[row] = self._vectors[last]
+                    self._sq_norms[row] = self._sq_norms[last]
+                    self._assign[row] = self._assign[last]
+                    self._rows[moved_id] = row
+                    if self._training is not None:
+                        self._changed_rows.add(row)
+                self._ids.pop()
+                self._metadata.pop()
+        self._schedule_save()
+
+    def close(self) -> None:
+        """Stop pending work and write the index one last time."""
+        with self._lock:
+            self._closed = True
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+        if self.persist_path:
+            self.save(self.persist_path)
+
+    def discard(self) -> None:
+        """Stop pending saves and delete the persisted file, e.g. when the event is dropped."""
+        with self._lock:
+            self._closed = True
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+        if self.persist_path:
+            with self._save_lock:
+                if os.path.exists(self.persist_path):
+                    os.remove(self.persist_path)
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to ``path`` (NumPy .npz with JSON metadata).
+
+        The rows are copied under the lock and written outside it, to a
+        temporary file that replaces ``path``, so a crash mid-write keeps the
+        previous file.
+        """
+        with self._lock:
+            count = len(self._ids)
+            # Fixed-width strings so loading never unpickles
+            ids = np.asarray(self._ids, dtype=np.str_)
+            vectors = self._vectors[:count].copy()
+            metadata = json.dumps(self._metadata)
+        with self._save_lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as f:
+                np.savez(f, ids=ids, vectors=vectors, metadata=np.asarray(metadata))
+            os.replace(temp_path, path)
+
+    def train(self) -> None:
+        """Train IVF centroids now, blocking until they are in use."""
+        with self._lock:
+            if self._training is None:
+                self._training = threading.current_thread()
+                self._changed_rows.clear()
+                owner = True
+            else:
+                owner = False
+                thread = self._training
+        if owner:
+            self._train()
+        else:
+            thread.join()
+
+    def _load(self, path: str) -> None:
+        data = np.load(path)
+        ids = [str(vector_id) for vector_id in data["ids"]]
+        metadata = json.loads(str(data["metadata"]))
+        self.upsert(list(zip(ids, data["vectors"], metadata)))
+        with self._lock:
+            # Nothing new to write back
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+        logger.info(f"Loaded {len(ids)} vectors from {path}")
+
+    def _schedule_save(self) -> None:
+        if not self.persist_path:
+            return
+        with self._lock:
+            if self._save_timer is not None or self._closed:
+                return
+            self._save_timer = threading.Timer(self.persist_delay, self._flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _flush(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._save_timer = None
+        try:
+            self.save(self.persist_path)
+        except Exception as e:
+            logger.error(f"Saving local index to {self.persist_path} failed: {e}")
+
+    def _maybe_train(self) -> None:
+        """Start background training once the index crosses the threshold or doubles. Call under the lock."""
+        count = len(self._ids)
+        if self._training is not None or count < self.ivf_threshold:
+            return
+        if self._centroids is not None and count <= 2 * self._trained_size:
+            return
+        self._changed_rows.clear()
+        self._training = threading.Thread(target=self._train, name="local-index-train", daemon=True)
+        self._training.start()
+
+    def _reserve(self, size: int) -> None:
+        capacity = self._vectors.shape[0]
+        if size <= capacity:
+            return
+        new_capacity = max(size, capacity * 2, 1024)
+        vectors = np.empty((new_capacity, self.dimension), dtype=np.float32)
+        vectors[:capacity] = self._vectors
+        self._vectors = vectors
+        self._sq_norms = np.resize(self._sq_norms, new_capacity)
+        self._assign = np.resize(self._assign, new_capacity)
+
+    def _nearest_centroids(self, vector: np.ndarray, n: int) -> np.ndarray:
+        distances = np.sum((self._centroids - vector) ** 2, axis=1)
+        n = min(n, distances.size)
+        return np.argpartition(distances, n - 1)[:n]
+
+    def _train(self, iterations: int = 10) -> None:
+        """
+        Fit IVF centroids with k-means on a sample and assign every vector.
+
+        Works on a copy taken under the lock; only the swap and the rows
+        written in the meantime are handled under the lock again.
+        """
+        try:
+            with self._lock:
+                count = len(self._ids)
+                vectors = self._vectors[:count].copy()
+            nlist = max(1, int(np.sqrt(count)))
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(count, size=min(count, nlist * 64), replace=False)]
+            centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+
+            for _ in range(iterations):
+                labels = self._assign_rows(sample, centroids)
+                for cluster in range(nlist):
+                    members = sample[labels == cluster]
+                    if members.size:
+                        centroids[cluster] = members.mean(axis=0)
+            assign = self._assign_rows(vectors, centroids)
+
+            with self._lock:
+                current = len(self._ids)
+                keep = min(count, current)
+                self._assign[:keep] = assign[:keep]
+                stale = [row for row in self._changed_rows if row < current]
+                stale.extend(range(keep, current))
+                if stale:
+                    rows = np.asarray(sorted(set(stale)), dtype=np.int64)
+                    self._assign[rows] = self._assign_rows(self._vectors[rows], centroids)
+                self._centroids = centroids
+                self._trained_size = count
+            logger.info(f"Trained local IVF index with {nlist} lists over {count} vectors")
+        except Exception as e:
+            logger.error(f"Training local IVF index failed: {e}")
+        finally:
+            with self._lock:
+                self._training = None
+                self._changed_rows.clear()
+
+    @staticmethod
+    def _assign_rows(vectors: np.ndarray, centroids: np.ndarray, block: int = 65536) -> np.ndarray:
+        labels = np.empty(vectors.shape[0], dtype=np.int32)
+        centroid_norms = np.sum(centroids ** 2, axis=1)
+        for start in range(0, vectors.shape[0], block):
+            chunk = vectors[start:start + block]
+            distances = centroid_norms - 2.0 * (chunk @ centroids.T)
+            labels[start:start + block] = np.argmin(distances, axis=1)
+        return labels
+
+
+class LocalVectorBackend(VectorBackend):
+    """
+    Embedded backend keeping one LocalVectorIndex shard per namespace.
+
+    Queries only touch the shard for their event, and dropping an event
+    discards its shard. With ``persist_dir`` set, each shard is saved as
+    ``<namespace>.npz`` shortly after each write and on close, and loaded
+    again on start.
+    """
+
+    DEFAULT_NAMESPACE = "_default"
+    vectorized = True
+
+    def __init__(self, dimension: int, ivf_threshold: int, nprobe: int, persist_dir: Optional[str] = None, persist_delay: float = 5.0):
+        self.dimension = dimension
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.persist_dir = persist_dir
+        self.persist_delay = persist_delay
+        self._shards: Dict[str, LocalVectorIndex] = {}
+        self._lock = threading.Lock()
+        if persist_dir and os.path.isdir(persist_dir):
+            for file_name in os.listdir(persist_dir):
+                if file_name.endswith(".npz"):
+                    self._shard(unquote(file_name[:-len(".npz")]))
+
+    def upsert(self, vectors: Sequence[Any], namespace: Optional[str] = None) -> int:
+        return self._shard(namespace).upsert(vectors)
+
+    def query(self, vector, top_k, filter=None, include_metadata=True, namespace=None):
+        shard = self._shards.get(namespace or self.DEFAULT_NAMESPACE)
+        if shard is None:
+            return {"matches": [], "namespace": namespace or ""}
+        response = shard.query(vector, top_k, filter=filter, include_metadata=include_metadata)
+        response["namespace"] = namespace or ""
+        return response
+
+    def query_batch(self, vectors, top_k, filter=None, include_metadata=True, namespace=None):
+        shard = self._shards.get(namespace or self.DEFAULT_NAMESPACE)
+        if shard is None:
+            return [{"matches": [], "namespace": namespace or ""} for _ in range(len(vectors))]
+        responses = shard.query_batch(vectors, top_k, filter=filter, include_metadata=include_metadata)
+        for response in responses:
+            response["namespace"] = namespace or ""
+        return responses
+
+    def delete(self, ids: List[str], namespace: Optional[str] = None) -> None:
+        shard = self._shards.get(namespace or self.DEFAULT_NAMESPACE)
+        if shard is not None:
+            shard.delete(ids)
+
+    def delete_namespace(self, namespace: str) -> None:
+        with self._lock:
+            shard = self._shards.pop(namespace, None)
+        if shard is not None:
+            shard.discard()
+
+    def close(self) -> None:
+        for shard in list(self._shards.values()):
+            shard.close()
+
+    def _shard(self, namespace: Optional[str]) -> LocalVectorIndex:
+        namespace = namespace or self.DEFAULT_NAMESPACE
+        shard = self._shards.get(namespace)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.get(namespace)
+                if shard is None:
+                    persist_path = (
+                        os.path.join(self.persist_dir, f"{quote(namespace, safe='')}.npz")
+                        if self.persist_dir else None
+                    )
+                    shard = LocalVectorIndex(
+                        self.dimension,
+                        ivf_threshold=self.ivf_threshold,
+                        nprobe=self.nprobe,
+                        persist_path=persist_path,
+                        persist_delay=self.persist_delay,
+                    )
+                    self._shards[namespace] = shard
+        return shard
+
+
+def create_backend() -> VectorBackend:
+    """Build the backend selected by ``settings.vector_backend``."""
+    backend = settings.vector_backend.lower()
+    if backend == "pinecone":
+        return PineconeBackend()
+    if backend == "local":
+        return LocalVectorBackend(
+            dimension=settings.vector_dimension,
+            ivf_threshold=settings.local_index_ivf_threshold,
+            nprobe=settings.local_index_nprobe,
+            persist_dir=settings.local_index_dir or None,
+            persist_delay=settings.local_index_persist_delay,
+        )
+    raise ValueError(f"Unknown vector backend: {settings.vector_backend}")
@@ -1,37 +1,162 @@
-from typing import List, Dict, Any, Optional
-from app.core.database import db
+import asyncio
+import json
+import random
+from functools import partial
+from typing import List, Dict, Any, NamedTuple, Optional, Sequence
+import numpy as np
+from app.config import settings
+from app.core.executors import get_vector_executor
 from app.core.logging import get_logger
+from app.core import tracing
+from app.core.metrics import registry
+from app.services.search_cache import QueryCache
+from app.services.vector_backends import VectorBackend, PineconeBackend, create_backend, normalize_vector
 
 logger = get_logger(__name__)
 
+VECTOR_CALL_SECONDS = registry.histogram(
+    "vector_store_call_seconds", "Vector backend call latency", ["operation"]
+)
+VECTOR_CALL_ERRORS = registry.counter(
+    "vector_store_errors_total", "Failed vector backend calls", ["operation"]
+)
+
+class BulkUpsertResult(NamedTuple):
+    upserted_count: int
+    failed_count: int
+    batch_count: int
+    failed_ids: List[str]
+
+
 class VectorStoreService:
+    _backend: Optional[VectorBackend] = None
+    _call_slots: Optional[asyncio.Semaphore] = None
+    _cache: Optional[QueryCache] = None
+
+    @classmethod
+    def get_backend(cls) -> VectorBackend:
+        """Return the configured vector backend, creating it on first use."""
+        if cls._backend is None:
+            cls._backend = create_backend()
+        return cls._backend
+
     @staticmethod
     def get_index():
-        if not db.pinecone_index:
-            logger.error("Pinecone index not initialized")
-            raise RuntimeError("Pinecone index not initialized")
-        return db.pinecone_index
+        return PineconeBackend.get_index()
+
+    @classmethod
+    def close(cls) -> None:
+        """Release the backend, persisting local indexes if configured."""
+        if cls._backend is not None:
+            cls._backend.close()
+            cls._backend = None
 
     @classmethod
-    def upsert_vectors(cls, vectors: List[tuple]) -> int:
+    def upsert_vectors(cls, vectors: List[tuple], event_id: Optional[str] = None) -> int:
         """
-        Upsert vectors to Pinecone.
+        Upsert vectors to the vector index.
         
         Args:
             vectors: List of tuples (id, vector, metadata)
+            event_id: Event partition (namespace) to write to
             
         Returns:
             Count of upserted vectors
         """
         try:
-            index = cls.get_index()
-            # Pinecone expects (id, values, metadata)
-            # Ensure vectors are in correct format
-            response = index.upsert(vectors=vectors)
-            return response.get('upserted_count', 0)
+            with VECTOR_CALL_SECONDS.time(operation="upsert"):
+                return cls.get_backend().upsert(vectors, namespace=event_id)
         except Exception as e:
+            VECTOR_CALL_ERRORS.inc(operation="upsert")
             logger.error(f"Error upserting vectors: {e}")
             raise e
+        finally:
+            cls._invalidate_for(vectors, event_id)
+
+    @classmethod
+    async def bulk_upsert(
+        cls,
+        vectors: Sequence[Any],
+        event_id: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_batch_bytes: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+    ) -> BulkUpsertResult:
+        """
+        Upsert a large number of vectors in size-bounded, concurrent batches.
+
+        Each batch is retried with exponential backoff; batches that still fail
+        are reported rather than aborting the whole upload.
+
+        Args:
+            vectors: (id, vector, metadata) tuples or dicts
+            event_id: Event partition (namespace) to write to
+            batch_size: Maximum vectors per request
+            max_batch_bytes: Approximate maximum request payload size
+            concurrency: Number of batches in flight at once
+            max_retries: Retries per batch after the first attempt
+
+        Returns:
+            Aggregate counts across all batches
+        """
+        batch_size = batch_size or settings.vector_upsert_batch_size
+        max_batch_bytes = max_batch_bytes or settings.vector_upsert_max_bytes
+        concurrency = concurrency or settings.vector_upsert_concurrency
+        max_retries = settings.vector_upsert_max_retries if max_retries is None else max_retries
+
+        batches = cls._split_batches(vectors, batch_size, max_batch_bytes)
+        if not batches:
+            return BulkUpsertResult(0, 0, 0, [])
+
+        backend = cls.get_backend()
+        # Batches share the vector executor and admission limits with every
+        # other call; this caps how many of them one bulk upsert queues at once
+        slots = asyncio.Semaphore(concurrency)
+        upserted_count = 0
+        failed_ids: List[str] = []
+
+        async def send(batch: List[tuple]) -> None:
+            nonlocal upserted_count
+            for attempt in range(max_retries + 1):
+                try:
+                    async with slots:
+                        await cls._run(backend.upsert, batch, namespace=event_id)
+                    upserted_count += len(batch)
+                    return
+                except Exception as e:
+                    if attempt == max_retries:
+                        logger.error(f"Upsert batch of {len(batch)} vectors failed after {attempt + 1} attempts: {e!r}")
+                        failed_ids.extend(vector_id for vector_id, _, _ in batch)
+                        return
+                    delay = settings.vector_upsert_backoff * (2 ** attempt)
+                    await asyncio.sleep(delay * (0.5 + random.random()))
+
+        try:
+            await asyncio.gather(*(send(batch) for batch in batches))
+        finally:
+            cls._invalidate_for(vectors, event_id)
+
+        return BulkUpsertResult(upserted_count, len(failed_ids), len(batches), failed_ids)
+
+    @staticmethod
+    def _split_batches(vectors: Sequence[Any], batch_size: int, max_batch_bytes: int) -> List[List[tuple]]:
+        batches: List[List[tuple]] = []
+        current: List[tuple] = []
+        current_bytes = 0
+        for item in vectors:
+            vector_id, values, metadata = normalize_vector(item)
+            values = [float(value) for value in values]
+            # Rough JSON payload estimate: ids, ~12 chars per float, metadata
+            size = len(vector_id) + 12 * len(values) + len(json.dumps(metadata, default=str))
+            if current and (len(current) >= batch_size or current_bytes + size > max_batch_bytes):
+                batches.append(current)
+                current, current_bytes = [], 0
+            current.append((vector_id, values, metadata))
+            current_bytes += size
+        if current:
+            batches.append(current)
+        return batches
 
     @classmethod
     def query_vectors(
@@ -39,46 +164,260 @@ class VectorStoreService:
         vector: List[float], 
         top_k: int = 10, 
         filter: Optional[Dict[str, Any]] = None,
-        include_metadata: bool = True
+        include_metadata: bool = True,
+        event_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Query vectors from Pinecone.
+        Query vectors from the vector index.
         
         Args:
             vector: Query vector
             top_k: Number of results to return
             filter: Metadata filter
             include_metadata: Whether to include metadata in results
+            event_id: Event partition to search; only that event's vectors are scanned
             
         Returns:
             Query response
         """
+        cache = cls.get_cache()
+        if cache is not None:
+            key, scope = cache.make_key(vector, top_k, filter, include_metadata, event_id)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+            generation = cache.generation(scope)
+
         try:
-            index = cls.get_index()
-            response = index.query(
-                vector=vector,
-                top_k=top_k,
-                filter=filter,
-                include_metadata=include_metadata
-            )
-            return response
+            with VECTOR_CALL_SECONDS.time(operation="query"):
+                response = cls.get_backend().query(
+                    vector,
+                    top_k=top_k,
+                    filter=filter,
+                    include_metadata=include_metadata,
+                    namespace=event_id
+                )
         except Exception as e:
+            VECTOR_CALL_ERRORS.inc(operation="query")
             logger.error(f"Error querying vectors: {e}")
             raise e
 
+        if cache is not None:
+            cache.put(key, scope, response, generation)
+        return response
+
+    @classmethod
+    def query_vectors_batch(
+        cls,
+        vectors: Any,
+        top_k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+        event_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Query several vectors at once, e.g. every face in a group selfie.
+
+        Cached rows are answered from the cache; the rest go to the backend
+        in one ``query_batch`` call.
+
+        Args:
+            vectors: N x dimension matrix of query vectors
+            top_k: Number of results per query
+            filter: Metadata filter
+            include_metadata: Whether to include metadata in results
+            event_id: Event partition to search
+
+        Returns:
+            One query response per row, in order
+        """
+        queries = np.asarray(vectors, dtype=np.float32)
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        pending = list(range(len(queries)))
+
+        cache = cls.get_cache()
+        if cache is not None:
+            lookups = {}
+            for row in pending:
+                key, scope = cache.make_key(queries[row], top_k, filter, include_metadata, event_id)
+                responses[row] = cache.get(key)
+                lookups[row] = (key, scope, cache.generation(scope))
+            pending = [row for row in pending if responses[row] is None]
+
+        if pending:
+            try:
+                with VECTOR_CALL_SECONDS.time(operation="query_batch"):
+                    results = cls.get_backend().query_batch(
+                        queries[pending],
+                        top_k=top_k,
+                        filter=filter,
+                        include_metadata=include_metadata,
+                        namespace=event_id
+                    )
+            except Exception as e:
+                VECTOR_CALL_ERRORS.inc(operation="query_batch")
+                logger.error(f"Error querying vectors: {e}")
+                raise e
+            for row, response in zip(pending, results):
+                responses[row] = response
+                if cache is not None:
+                    key, scope, generation = lookups[row]
+                    cache.put(key, scope, response, generation)
+        return responses
+
+    @classmethod
+    def get_cache(cls) -> Optional[QueryCache]:
+        """
+        Return the query result cache, or None if caching is disabled.
+
+        Invalidation only reaches this process's cache, so when other
+        processes also write vectors the TTL is capped to
+        ``search_cache_shared_ttl`` to bound how stale a result can be.
+        """
+        if cls._cache is None and settings.search_cache_enabled:
+            ttl = settings.search_cache_ttl
+            if settings.web_concurrency > 1 or settings.ingest_queue_backend.lower() == "mongo":
+                ttl = min(ttl, settings.search_cache_shared_ttl)
+            cls._cache = QueryCache(
+                max_entries=settings.search_cache_max_entries,
+                max_bytes=settings.search_cache_max_bytes,
+                ttl=ttl,
+                quantization=settings.search_cache_quantization,
+            )
+        return cls._cache
+
+    @classmethod
+    def _invalidate_for(cls, vectors: Sequence[Any], event_id: Optional[str] = None) -> None:
+        """Drop cached results for every event touched by ``vectors``."""
+        if cls._cache is None:
+            return
+        if event_id is not None:
+            cls._cache.invalidate(event_id)
+            return
+        event_ids = set()
+        for item in vectors:
+            event_id = normalize_vector(item)[2].get("event_id")
+            if not isinstance(event_id, str):
+                cls._cache.invalidate()
+                return
+            event_ids.add(event_id)
+        for event_id in event_ids:
+            cls._cache.invalidate(event_id)
+
+    @classmethod
+    async def _run(cls, func, *args, **kwargs):
+        """
+        Run a blocking backend call on the vector executor.
+
+        Calls are admitted through a semaphore (vector_max_concurrency) and
+        abandoned after vector_timeout seconds, so a slow vector store cannot
+        stall the event loop or pile up unbounded work.
+        """
+        if cls._call_slots is None:
+            cls._call_slots = asyncio.Semaphore(settings.vector_max_concurrency)
+        loop = asyncio.get_running_loop()
+        with tracing.span(f"vector.{func.__name__}"):
+            async with cls._call_slots:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(get_vector_executor(), partial(func, *args, **kwargs)),
+                    timeout=settings.vector_timeout,
+                )
+
+    @classmethod
+    async def upsert_vectors_async(cls, vectors: List[tuple], event_id: Optional[str] = None) -> int:
+        """Async variant of upsert_vectors for use in request handlers."""
+        return await cls._run(cls.upsert_vectors, vectors, event_id=event_id)
+
+    @classmethod
+    async def query_vectors_async(
+        cls,
+        vector: List[float],
+        top_k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+        event_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Async variant of query_vectors for use in request handlers."""
+        return await cls._run(
+            cls.query_vectors,
+            vector,
+            top_k=top_k,
+            filter=filter,
+            include_metadata=include_metadata,
+            event_id=event_id,
+        )
+
+    @classmethod
+    async def query_vectors_batch_async(
+        cls,
+        vectors: Any,
+        top_k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+        event_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Async variant of query_vectors_batch.
+
+        Vectorized backends answer the whole matrix in one executor call;
+        remote backends get one concurrent query per row.
+        """
+        kwargs = dict(top_k=top_k, filter=filter, include_metadata=include_metadata, event_id=event_id)
+        if cls.get_backend().vectorized:
+            return await cls._run(cls.query_vectors_batch, vectors, **kwargs)
+        return list(await asyncio.gather(*(
+            cls.query_vectors_async(vector.tolist(), **kwargs)
+            for vector in np.asarray(vectors, dtype=np.float32)
+        )))
+
+    @classmethod
+    async def delete_vectors_async(cls, ids: List[str], event_id: Optional[str] = None) -> None:
+        """Async variant of delete_vectors for use in request handlers."""
+        await cls._run(cls.delete_vectors, ids, event_id=event_id)
+
+    @classmethod
+    async def delete_event_async(cls, event_id: str) -> None:
+        """Async variant of delete_event for use in request handlers."""
+        await cls._run(cls.delete_event, event_id)
+
     @classmethod
-    def delete_vectors(cls, ids: List[str]):
+    def delete_vectors(cls, ids: List[str], event_id: Optional[str] = None):
         """
-        Delete vectors from Pinecone.
+        Delete vectors from the vector index.
         
         Args:
             ids: List of vector IDs to delete
+            event_id: Event partition the vectors live in; also scopes cache
+                invalidation (if omitted every cached result is dropped)
         """
         try:
-            index = cls.get_index()
-            index.delete(ids=ids)
+            with VECTOR_CALL_SECONDS.time(operation="delete"):
+                cls.get_backend().delete(ids, namespace=event_id)
         except Exception as e:
+            VECTOR_CALL_ERRORS.inc(operation="delete")
             logger.error(f"Error deleting vectors: {e}")
             raise e
+        finally:
+            if cls._cache is not None:
+                cls._cache.invalidate(event_id)
+
+    @classmethod
+    def delete_event(cls, event_id: str):
+        """
+        Drop an event's whole vector partition in one operation.
+        
+        Args:
+            event_id: Event whose vectors should be removed
+        """
+        try:
+            with VECTOR_CALL_SECONDS.time(operation="delete_namespace"):
+                cls.get_backend().delete_namespace(event_id)
+        except Exception as e:
+            VECTOR_CALL_ERRORS.inc(operation="delete_namespace")
+            logger.error(f"Error deleting vectors for event {event_id}: {e}")
+            raise e
+        finally:
+            if cls._cache is not None:
+                cls._cache.invalidate(event_id)
 
 vector_store = VectorStoreService()
@@ -0,0 +1,9 @@
+import os
+
+# Settings without defaults; the units under test never connect to these
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017/photo_retriever_test")
+os.environ.setdefault("PINECONE_API_KEY", "test")
+os.environ.setdefault("PINECONE_ENV", "test")
+os.environ.setdefault("PINECONE_INDEX_NAME", "test")
+os.environ.setdefault("JWT_SECRET_KEY", "test")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
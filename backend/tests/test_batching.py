@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from app.core.batching import MicroBatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_submits_share_batches():
+    batches = []
+
+    async def handler(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(handler, max_size=4, max_wait=0.05)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        finally:
+            await batcher.stop()
+
+    assert run(main()) == [i * 2 for i in range(10)]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert sorted(item for batch in batches for item in batch) == list(range(10))
+
+
+def test_partial_batch_dispatched_after_max_wait():
+    async def handler(items):
+        return items
+
+    async def main():
+        batcher = MicroBatcher(handler, max_size=100, max_wait=0.02)
+        try:
+            result = await asyncio.wait_for(batcher.submit("only"), 1.0)
+            return result, batcher.batches, batcher.items
+        finally:
+            await batcher.stop()
+
+    assert run(main()) == ("only", 1, 1)
+
+
+def test_item_exception_fails_only_its_caller():
+    async def handler(items):
+        return [ValueError(item) if item == "bad" else item.upper() for item in items]
+
+    async def main():
+        batcher = MicroBatcher(handler, max_size=3, max_wait=0.05)
+        try:
+            return await asyncio.gather(*(batcher.submit(item) for item in ["a", "bad", "c"]), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    ok, failed, other = run(main())
+    assert (ok, other) == ("A", "C")
+    assert isinstance(failed, ValueError)
+
+
+def test_handler_failure_propagates_to_whole_batch_and_recovers():
+    calls = 0
+
+    async def handler(items):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("model crashed")
+        return items
+
+    async def main():
+        batcher = MicroBatcher(handler, max_size=2, max_wait=0.05)
+        try:
+            first = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+            second = await batcher.submit(3)
+            return first, second
+        finally:
+            await batcher.stop()
+
+    first, second = run(main())
+    assert all(isinstance(result, RuntimeError) for result in first)
+    assert second == 3
+
+
+def test_concurrency_limits_running_batches():
+    running = 0
+    peak = 0
+
+    async def handler(items):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return items
+
+    async def main():
+        batcher = MicroBatcher(handler, max_size=1, max_wait=0.0, concurrency=2)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+        finally:
+            await batcher.stop()
+
+    assert run(main()) == list(range(6))
+    assert peak == 2
+
+
+def test_stop_cancels_waiting_callers():
+    async def handler(items):
+        await asyncio.sleep(10)
+        return items
+
+    async def main():
+        batcher = MicroBatcher(handler, max_size=1, max_wait=0.0)
+        waiting = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.01)
+        await batcher.stop()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    run(main())
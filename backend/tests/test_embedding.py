@@ -0,0 +1,79 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from app.services import embedding
+from app.services.embedding import FaceEmbedder, ReferenceEmbedder, embed_batch, embed_image
+
+
+def gradient(width=200, height=120, shift=0):
+    x = (np.arange(width)[None, :] + shift) % 256
+    y = np.arange(height)[:, None]
+    pixels = ((x + y) % 256).astype(np.uint8)
+    return Image.fromarray(np.stack([pixels] * 3, axis=-1))
+
+
+def encode(image, format="PNG"):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def test_detects_centred_square():
+    assert ReferenceEmbedder().detect(Image.new("RGB", (200, 120))) == [(40, 0, 160, 120)]
+    assert ReferenceEmbedder().detect(Image.new("RGB", (0, 10))) == []
+
+
+def test_embeddings_are_deterministic_and_normalised():
+    embedder = ReferenceEmbedder()
+    boxes, first = embed_image(embedder, gradient())
+    _, second = embed_image(embedder, gradient())
+
+    assert len(boxes) == 1
+    assert first.shape == (1, 128) and first.dtype == np.float32
+    np.testing.assert_array_equal(first, second)
+    assert np.linalg.norm(first[0]) == pytest.approx(1.0, rel=1e-5)
+
+
+def test_similar_images_are_closer_than_different_ones():
+    embedder = ReferenceEmbedder()
+    base = embed_image(embedder, gradient())[1][0]
+    similar = embed_image(embedder, gradient(shift=2))[1][0]
+    other = Image.new("RGB", (200, 120), "white")
+    ImageDraw.Draw(other).ellipse((60, 20, 140, 100), fill="black")
+    different = embed_image(embedder, other)[1][0]
+
+    assert np.sum((base - similar) ** 2) < np.sum((base - different) ** 2)
+
+
+def test_flat_image_embeds_to_zero_vector():
+    vector = embed_image(ReferenceEmbedder(), Image.new("RGB", (64, 64), "grey"))[1][0]
+    assert not np.any(vector)
+
+
+def test_rejects_other_dimensions():
+    with pytest.raises(ValueError):
+        ReferenceEmbedder(64)
+
+
+def test_embed_batch_reports_errors_per_source(monkeypatch):
+    monkeypatch.setattr(embedding, "_worker_embedder", ReferenceEmbedder())
+    data = encode(gradient())
+
+    results = embed_batch([data, b"not an image", data])
+
+    (first, first_error), (missing, error), (last, _) = results
+    assert first_error is None and first.shape == (1, 128)
+    assert missing is None and error
+    np.testing.assert_array_equal(first, last)
+
+
+def test_embedders_must_implement_detect_and_embed():
+    class DetectOnly(FaceEmbedder):
+        def detect(self, image):
+            return []
+
+    with pytest.raises(TypeError):
+        DetectOnly()
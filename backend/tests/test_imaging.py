@@ -0,0 +1,59 @@
+import io
+
+from PIL import ExifTags, Image
+
+from app.core.imaging import image_size, load_image, render_resized
+
+
+def jpeg(width, height, **save_args):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "orange").save(buffer, format="JPEG", **save_args)
+    return buffer.getvalue()
+
+
+def test_image_size_reads_only_the_header():
+    data = jpeg(3000, 2000)
+    # Pixel data is cut off; a full decode would fail
+    assert image_size(data[:2048]) == (3000, 2000)
+
+
+def test_load_image_downscales_and_reports_scale():
+    loaded = load_image(jpeg(4000, 3000), max_side=500)
+
+    assert max(loaded.image.size) == 500
+    assert loaded.original_size == (4000, 3000)
+    assert loaded.scale == 8.0
+
+
+def portrait_jpeg():
+    # Stored sideways, as cameras do: landscape pixels with Orientation=6
+    # (rotate 90 degrees clockwise); the top of the scene is on the left
+    image = Image.new("RGB", (400, 200), "blue")
+    image.paste((255, 0, 0), (0, 0, 100, 200))
+    exif = image.getexif()
+    exif[ExifTags.Base.Orientation] = 6
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def test_exif_orientation_is_applied():
+    data = portrait_jpeg()
+
+    assert image_size(data) == (200, 400)
+    for max_side in (None, 100):
+        loaded = load_image(data, max_side)
+        width, height = loaded.image.size
+        assert height > width
+        assert loaded.original_size == (200, 400)
+        # The red band ends up at the top once rotated upright
+        red, green, blue = loaded.image.getpixel((width // 2, height // 16))
+        assert red > 200 and blue < 60
+
+
+def test_renditions_are_upright(tmp_path):
+    path = str(tmp_path / "thumb.jpg")
+    render_resized(portrait_jpeg(), [(path, 100)], "JPEG", 85)
+
+    with Image.open(path) as thumbnail:
+        assert thumbnail.size == (50, 100)
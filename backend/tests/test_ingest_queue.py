@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+from beanie import PydanticObjectId
+
+from app.services.ingest_service import ImageQueue, MemoryImageQueue
+
+
+def test_image_queue_is_abstract():
+    with pytest.raises(TypeError):
+        ImageQueue()
+
+
+def test_memory_queue_skips_ids_already_waiting(monkeypatch):
+    claimed = []
+
+    async def claim_document(query):
+        claimed.append(query["_id"])
+        return query["_id"]
+
+    monkeypatch.setattr(MemoryImageQueue, "_claim_document", staticmethod(claim_document))
+    first, second = PydanticObjectId(), PydanticObjectId()
+
+    async def main():
+        queue = MemoryImageQueue()
+        # Recovery passes re-enqueue the same backlog
+        for _ in range(3):
+            await queue.put([first, second])
+        assert queue._queue.qsize() == 2
+        await queue.claim()
+        # Claimed ids can be queued again, e.g. after a reset to UPLOADED
+        await queue.put([first, second])
+        assert queue._queue.qsize() == 2
+        await queue.claim()
+        await queue.claim()
+
+    asyncio.run(main())
+    assert claimed == [first, second, first]
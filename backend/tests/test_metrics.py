@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+
+from app.config import settings
+from app.core.metrics import Registry
+
+SNAPSHOT = {"jobs_total": {"type": "counter", "help": "jobs", "labels": [], "samples": [[[], 5]]}}
+
+
+def write_snapshot(directory, file_name, mtime=None):
+    path = os.path.join(directory, file_name)
+    with open(path, "w") as f:
+        json.dump(SNAPSHOT, f)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_render_sums_live_workers_and_prunes_stale_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_dir", str(tmp_path))
+    registry = Registry()
+    registry.counter("jobs_total", "jobs").inc(1)
+    exited = subprocess.Popen(["true"])
+    exited.wait()
+
+    write_snapshot(tmp_path, f"{os.getppid()}.json")
+    write_snapshot(tmp_path, f"{exited.pid}.json")
+    write_snapshot(tmp_path, f"{os.getppid()}.json.tmp", mtime=0)
+    write_snapshot(tmp_path, "4194000.json", mtime=0)
+
+    assert "jobs_total 6\n" in registry.render()
+    assert os.listdir(tmp_path) == [f"{os.getppid()}.json"]
+
+
+def test_histogram_buckets_are_cumulative(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_dir", "")
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "latency", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, route="/a")
+
+    text = registry.render()
+
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+
+
+def test_collectors_export_gauges_and_counters(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_dir", "")
+    registry = Registry()
+    registry.register_collector(lambda: {"queue_pending": 3})
+    registry.register_collector(lambda: {"cache_hits_total": 7}, type="counter")
+
+    text = registry.render()
+
+    assert "# TYPE queue_pending gauge\nqueue_pending 3\n" in text
+    assert "# TYPE cache_hits_total counter\ncache_hits_total 7\n" in text
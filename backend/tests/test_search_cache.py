@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services import search_cache
+from app.services.search_cache import GLOBAL_SCOPE, QueryCache
+from app.services.vector_store import VectorStoreService
+
+RESULT = {"matches": [{"id": "a", "score": 0.1, "metadata": {"event_id": "e1"}}]}
+
+
+@pytest.fixture
+def cache():
+    return QueryCache(max_entries=100, max_bytes=1 << 20, ttl=60.0, quantization=0.01)
+
+
+def cached(cache, vector, filter=None, event_id=None):
+    key, scope = cache.make_key(vector, 5, filter, True, event_id=event_id)
+    cache.put(key, scope, RESULT, cache.generation(scope))
+    return key
+
+
+def test_nearby_queries_share_an_entry(cache):
+    vector = np.arange(8) * 0.05
+    cached(cache, vector, event_id="e1")
+
+    near, _ = cache.make_key(vector + 0.001, 5, None, True, event_id="e1")
+    far, _ = cache.make_key(vector + 0.1, 5, None, True, event_id="e1")
+
+    assert cache.get(near) == RESULT
+    assert cache.get(far) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(search_cache.time, "monotonic", lambda: now[0])
+    key = cached(cache, np.zeros(8), event_id="e1")
+
+    now[0] += 59.0
+    assert cache.get(key) == RESULT
+    now[0] += 2.0
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidation_is_scoped_to_the_event(cache):
+    e1 = cached(cache, np.zeros(8), event_id="e1")
+    e2 = cached(cache, np.zeros(8), event_id="e2")
+    unscoped = cached(cache, np.zeros(8))
+
+    cache.invalidate("e1")
+
+    assert cache.get(e1) is None
+    assert cache.get(e2) == RESULT
+    # Unscoped results may include e1's vectors
+    assert cache.get(unscoped) is None
+
+
+def test_filter_pins_the_scope(cache):
+    _, scope = cache.make_key(np.zeros(8), 5, {"event_id": {"$eq": "e1"}}, True)
+    assert scope == "e1"
+    _, scope = cache.make_key(np.zeros(8), 5, {"person": "x"}, True)
+    assert scope == GLOBAL_SCOPE
+
+
+def test_write_during_query_is_not_cached(cache):
+    key, scope = cache.make_key(np.zeros(8), 5, None, True, event_id="e1")
+    generation = cache.generation(scope)
+
+    cache.invalidate("e1")
+    cache.put(key, scope, RESULT, generation)
+    assert cache.get(key) is None
+
+    # A write to another event does not block caching
+    generation = cache.generation(scope)
+    cache.invalidate("e2")
+    cache.put(key, scope, RESULT, generation)
+    assert cache.get(key) == RESULT
+
+
+def test_unscoped_query_races_with_any_write(cache):
+    key, scope = cache.make_key(np.zeros(8), 5, None, True)
+    generation = cache.generation(scope)
+
+    cache.invalidate("e2")
+    cache.put(key, scope, RESULT, generation)
+
+    assert cache.get(key) is None
+
+
+def test_lru_eviction(cache):
+    cache.max_entries = 2
+    first = cached(cache, np.zeros(8), event_id="e1")
+    second = cached(cache, np.ones(8), event_id="e1")
+    assert cache.get(first) == RESULT
+    cached(cache, np.full(8, 2.0), event_id="e1")
+
+    assert cache.get(second) is None
+    assert cache.get(first) == RESULT
+    assert cache.evictions == 1
+
+
+@pytest.mark.parametrize(
+    "web_concurrency, queue_backend, expected_ttl",
+    [(1, "memory", 300.0), (4, "memory", 5.0), (1, "mongo", 5.0)],
+)
+def test_ttl_is_capped_when_other_processes_write(monkeypatch, web_concurrency, queue_backend, expected_ttl):
+    monkeypatch.setattr(settings, "search_cache_enabled", True)
+    monkeypatch.setattr(settings, "search_cache_ttl", 300.0)
+    monkeypatch.setattr(settings, "search_cache_shared_ttl", 5.0)
+    monkeypatch.setattr(settings, "web_concurrency", web_concurrency)
+    monkeypatch.setattr(settings, "ingest_queue_backend", queue_backend)
+    monkeypatch.setattr(VectorStoreService, "_cache", None)
+
+    assert VectorStoreService.get_cache().ttl == expected_ttl
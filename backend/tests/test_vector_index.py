@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.services.vector_backends import LocalVectorIndex
+
+DIMENSION = 16
+
+
+def clustered_vectors(count, clusters=40, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, DIMENSION)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    return centres[labels] + 0.1 * rng.normal(size=(count, DIMENSION)).astype(np.float32)
+
+
+def build(vectors, **kwargs):
+    index = LocalVectorIndex(DIMENSION, **kwargs)
+    index.upsert([(f"v{i}", vector, {"group": i % 3}) for i, vector in enumerate(vectors)])
+    return index
+
+
+def brute_force(vectors, query, top_k):
+    distances = np.sum((vectors - query) ** 2, axis=1)
+    return [f"v{i}" for i in np.argsort(distances)[:top_k]], np.sort(distances)[:top_k]
+
+
+def test_exhaustive_search_matches_brute_force():
+    vectors = clustered_vectors(500)
+    index = build(vectors)
+    for query in clustered_vectors(20, seed=1):
+        expected_ids, expected_scores = brute_force(vectors, query, 5)
+        matches = index.query(query, top_k=5)["matches"]
+        assert [match["id"] for match in matches] == expected_ids
+        assert [match["score"] for match in matches] == pytest.approx(expected_scores, rel=1e-4, abs=1e-4)
+
+
+def test_ivf_recall_against_brute_force():
+    vectors = clustered_vectors(5000)
+    index = build(vectors, ivf_threshold=1000, nprobe=8)
+    queries = clustered_vectors(50, seed=2)
+    index.train()
+
+    responses = index.query_batch(queries, top_k=10, include_metadata=False)
+
+    assert index._centroids is not None
+    found = 0
+    for query, response in zip(queries, responses):
+        expected, _ = brute_force(vectors, query, 10)
+        found += len(set(expected) & {match["id"] for match in response["matches"]})
+    assert found / (10 * len(queries)) >= 0.9
+
+
+def test_filter_and_delete():
+    vectors = clustered_vectors(300)
+    index = build(vectors)
+
+    matches = index.query(vectors[0], top_k=20, filter={"group": 0})["matches"]
+    assert matches and all(match["metadata"]["group"] == 0 for match in matches)
+
+    index.delete(["v0", "missing"])
+    assert len(index) == 299
+    assert "v0" not in {match["id"] for match in index.query(vectors[0], top_k=5)["matches"]}
+    # The last row moved into the deleted slot and is still found exactly
+    assert index.query(vectors[-1], top_k=1)["matches"][0]["id"] == "v299"
+
+
+def test_upsert_replaces_existing_vector():
+    index = LocalVectorIndex(DIMENSION)
+    index.upsert([("a", np.zeros(DIMENSION), {"n": 1})])
+    index.upsert([("a", np.ones(DIMENSION), {"n": 2})])
+
+    match = index.query(np.ones(DIMENSION), top_k=1)["matches"][0]
+    assert len(index) == 1
+    assert (match["id"], match["metadata"]) == ("a", {"n": 2})
+    assert match["score"] == pytest.approx(0.0)
+
+
+def test_rejects_wrong_dimension():
+    index = LocalVectorIndex(DIMENSION)
+    with pytest.raises(ValueError):
+        index.upsert([("a", np.zeros(DIMENSION + 1), {})])
+
+
+def test_persists_without_pickle(tmp_path):
+    path = str(tmp_path / "event.npz")
+    vectors = clustered_vectors(50)
+    build(vectors, persist_path=path).close()
+
+    with np.load(path) as data:
+        assert data["ids"].dtype.kind == "U"
+    restored = LocalVectorIndex(DIMENSION, persist_path=path)
+    match = restored.query(vectors[7], top_k=1)["matches"][0]
+    assert len(restored) == 50
+    assert (match["id"], match["metadata"]) == ("v7", {"group": 1})
+
+
+def test_training_runs_in_the_background():
+    vectors = clustered_vectors(3000)
+    index = LocalVectorIndex(DIMENSION, ivf_threshold=2000)
+    index.upsert([(f"v{i}", vector, {}) for i, vector in enumerate(vectors[:2500])])
+    training = index._training
+    assert isinstance(training, threading.Thread)
+
+    # Writes and exhaustive queries go on while centroids are fitted
+    index.upsert([(f"v{i}", vector, {}) for i, vector in enumerate(vectors[2500:], start=2500)])
+    assert index.query(vectors[2999], top_k=1)["matches"][0]["id"] == "v2999"
+    index.delete(["v0"])
+    training.join()
+
+    assert index._centroids is not None
+    # Rows written during training were assigned to the new centroids
+    assert index.query(vectors[2999], top_k=1)["matches"][0]["id"] == "v2999"
+    assert index.query(vectors[2998], top_k=1)["matches"][0]["id"] == "v2998"
+
+
+def test_writes_are_saved_without_close(tmp_path):
+    path = str(tmp_path / "event.npz")
+    index = LocalVectorIndex(DIMENSION, persist_path=path, persist_delay=0.05)
+    index.upsert([("a", np.ones(DIMENSION), {})])
+
+    deadline = time.monotonic() + 5
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(LocalVectorIndex(DIMENSION, persist_path=path)) == 1
+
+    index.discard()
+    assert not os.path.exists(path)